@@ -0,0 +1,89 @@
+import argparse
+import pathlib
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = pathlib.Path(__file__).resolve().parent.parent / "src"
+
+FUNCTION_TEMPLATE = "fn {0}_{1}(a int) int {{\n    return a * {1} + {1}\n}}\n"
+
+
+def write_inputs(directory: pathlib.Path, inputs: int, functions: int):
+    directory.joinpath("prelude.pasm").write_text(
+        "".join(FUNCTION_TEMPLATE.format("prelude", i) for i in range(functions))
+    )
+
+    file_paths = []
+
+    for i in range(inputs):
+        file_path = directory.joinpath(f"input_{i}.pasm")
+        file_path.write_text(
+            'include "prelude.pasm"\n'
+            + "".join(FUNCTION_TEMPLATE.format("local", j) for j in range(10))
+            + f"fn main() int {{\n    return prelude_{i % functions}(local_{i % 10}({i}))\n}}\n"
+        )
+        file_paths.append(file_path)
+
+    return file_paths
+
+
+def run(command: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stderr=subprocess.DEVNULL)
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="batch compilation benchmark")
+    parser.add_argument("--inputs", type=int, default=50)
+    parser.add_argument("--functions", type=int, default=2000)
+    parser.add_argument("--jobs", type=int, default=2)
+    # Codegen only runs on aarch64, another machine needs a wrapper that runs
+    # the compiler the same way
+    parser.add_argument("--command", default=f"{shlex.quote(sys.executable)} {SRC}")
+    args = parser.parse_args()
+
+    command = shlex.split(args.command)
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = pathlib.Path(directory)
+        file_paths = write_inputs(directory, args.inputs, args.functions)
+        options = ["--cache-dir", str(directory / "cache"), "-O2"]
+        inputs = [str(file_path) for file_path in file_paths]
+
+        # Fill the token cache, so every run below starts warm
+        run(command + options + ["--output-dir", str(directory), inputs[0]])
+
+        print(f"{'mode':>20} {'seconds':>9} {'per file':>9}")
+
+        for mode, elapsed in [
+            (
+                "process per file",
+                sum(
+                    run(command + options + ["--output-dir", str(directory), path])
+                    for path in inputs
+                ),
+            ),
+            (
+                "batch",
+                run(command + options + ["--output-dir", str(directory)] + inputs),
+            ),
+            (
+                f"batch -j {args.jobs}",
+                run(
+                    command
+                    + options
+                    + ["--output-dir", str(directory), "-j", str(args.jobs)]
+                    + inputs
+                ),
+            ),
+        ]:
+            print(f"{mode:>20} {elapsed:>9.3f} {elapsed / args.inputs:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
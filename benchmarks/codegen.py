@@ -0,0 +1,66 @@
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.asm.backends.aarch64 import Aarch64Backend
+from compiler.asm.gen import ASMGen
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.ir.gen import IRGen
+from compiler.ir.linear import LinearLowering
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+def generate_program(functions: int, calls: int) -> str:
+    chunks = []
+    calls_per_function = calls // functions
+
+    for i in range(functions):
+        body = "".join(
+            f"    function_{j}()\n" for j in range(max(0, i - calls_per_function), i)
+        )
+        chunks.append(f"fn function_{i}() void {{\n{body}}}\n\n")
+
+    chunks.append(f"fn main() void {{\n    function_{functions - 1}()\n}}\n")
+
+    return "".join(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ir and assembly generation benchmark")
+    parser.add_argument("--functions", type=int, default=50_000)
+    parser.add_argument("--calls", type=int, default=500_000)
+    args = parser.parse_args()
+
+    source = generate_program(args.functions, args.calls).encode()
+    files = FileTable()
+    program = Parser(
+        Lexer(
+            source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+        ).stream()
+    ).parse()
+
+    start = time.perf_counter()
+    ir_gen = IRGen(program)
+    ir_gen.generate()
+    ir_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    backend = Aarch64Backend()
+    ASMGen(
+        backend, LinearLowering(ir_gen.code, backend.fits_immediate_operand).run()
+    ).generate()
+    asm_elapsed = time.perf_counter() - start
+
+    print(f"functions    : {args.functions}")
+    print(f"calls        : {args.calls}")
+    print(f"ir seconds   : {ir_elapsed:.3f}")
+    print(f"asm seconds  : {asm_elapsed:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.asm.backends.aarch64 import Aarch64Backend
+from compiler.asm.gen import ASMGen
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.ir.code import IRCode, IRInteger
+from compiler.ir.ctfe import CompileTimeEvaluator
+from compiler.ir.fold import wrap_integer
+from compiler.ir.gen import IRGen
+from compiler.ir.linear import LinearLowering
+from compiler.ir.optimize import Optimizer
+from compiler.ir.verify import IRVerifier
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+OPERATORS = ["+", "-", "*", "+"]
+
+
+def generate_chain(depth: int) -> str:
+    """
+    A single left deep chain of binary operations
+    """
+
+    body = " ".join(f"{i % 1000} {OPERATORS[i % 4]}" for i in range(depth - 1))
+
+    return f"fn main() int {{\n    return {body} 1\n}}\n"
+
+
+def evaluate_chain(depth: int) -> int:
+    """
+    The value of generate_chain(depth), a sum of products of the operands
+    """
+
+    operands = [i % 1000 for i in range(depth - 1)] + [1]
+    total = 0
+    sign = 1
+    term = operands[0]
+
+    for i, operand in enumerate(operands[1:]):
+        match OPERATORS[i % 4]:
+            case "*":
+                term *= operand
+            case operator:
+                total += sign * term
+                sign = -1 if operator == "-" else 1
+                term = operand
+
+    return wrap_integer(total + sign * term)
+
+
+def generate_nested_calls(depth: int) -> str:
+    """
+    Calls nested inside the argument of the previous call
+    """
+
+    body = "f(" * depth + "1" + ")" * depth
+
+    return (
+        "fn f(a int) int {\n    return a + 1\n}\n\n"
+        f"fn main() int {{\n    return {body}\n}}\n"
+    )
+
+
+def compile_source(source: bytes, level: int) -> tuple[dict[str, float], IRCode]:
+    timings = {}
+
+    # Tokens are streamed, so lexing is part of parsing here
+    start = time.perf_counter()
+    files = FileTable()
+    program = Parser(
+        Lexer(
+            source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+        ).stream()
+    ).parse()
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ir_gen = IRGen(program)
+    ir_gen.generate()
+    Optimizer(ir_gen.code, level).run()
+    IRVerifier(ir_gen.code).run()
+    timings["ir"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    backend = Aarch64Backend()
+    ASMGen(
+        backend, LinearLowering(ir_gen.code, backend.fits_immediate_operand).run()
+    ).generate()
+    timings["asm"] = time.perf_counter() - start
+
+    return timings, ir_gen.code
+
+
+def check_result(code: IRCode, shape: str, depth: int, level: int) -> bool:
+    """
+    Whether main still computes what the source says, by running the
+    optimized IR of main through the compile time interpreter. The chain has
+    to be folded down to a constant from -O1 on.
+    """
+
+    value = code.blocks[code.get_block("main")].instructions[-1].value
+
+    if shape == "chain" and level >= 1 and not isinstance(value, IRInteger):
+        return False
+
+    evaluator = CompileTimeEvaluator(code, step_limit=sys.maxsize)
+    expected = evaluate_chain(depth) if shape == "chain" else depth + 1
+
+    return evaluator.evaluate(value, [], 0) == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="deeply nested expression stress")
+    parser.add_argument("--depths", type=int, nargs="+", default=[1_000, 1_000_000])
+    parser.add_argument(
+        "-O", dest="levels", type=int, nargs="+", default=[0, 1, 2], choices=[0, 1, 2]
+    )
+    args = parser.parse_args()
+
+    print(f"recursion limit: {sys.getrecursionlimit()}")
+    print(
+        f"{'shape':>8} {'depth':>9} {'level':>5} {'parse':>8} {'ir':>8} {'asm':>8} {'us/node':>8} {'result':>7}"
+    )
+
+    failed = False
+
+    for depth in args.depths:
+        for shape, generate in [
+            ("chain", generate_chain),
+            ("calls", generate_nested_calls),
+        ]:
+            for level in args.levels:
+                timings, code = compile_source(generate(depth).encode(), level)
+                per_node = sum(timings.values()) / depth * 1_000_000
+                ok = check_result(code, shape, depth, level)
+                failed = failed or not ok
+
+                print(
+                    f"{shape:>8} {depth:>9} {level:>5} {timings['parse']:>8.3f}"
+                    f" {timings['ir']:>8.3f} {timings['asm']:>8.3f} {per_node:>8.2f}"
+                    f" {'ok' if ok else 'wrong':>7}"
+                )
+
+    if failed:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import io
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.asm.backends.aarch64 import Aarch64Backend
+from compiler.asm.code import ASMCode
+from compiler.asm.gen import ASMGen
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.ir.gen import IRGen
+from compiler.ir.linear import LinearLowering
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+def generate_program(instructions: int) -> str:
+    # Every call below lowers to two argument moves and a branch
+    calls = instructions // 3
+    functions = max(1, calls // 1000)
+    chunks = ["fn target(a int, b int) void {\n}\n\n"]
+
+    for i in range(functions):
+        body = "    target(1, 2)\n" * (calls // functions)
+        chunks.append(f"fn function_{i}() void {{\n{body}}}\n\n")
+
+    chunks.append("fn main() void {\n    function_0()\n}\n")
+
+    return "".join(chunks)
+
+
+def emit(linear_code, open_output) -> tuple[float, int]:
+    with open_output() as output:
+        start = time.perf_counter()
+        ASMGen(Aarch64Backend(ASMCode(output)), linear_code).generate()
+        output.flush()
+        elapsed = time.perf_counter() - start
+
+    # Measured in a second run, tracing slows the emitter down several times
+    with open_output() as output:
+        tracemalloc.start()
+        ASMGen(Aarch64Backend(ASMCode(output)), linear_code).generate()
+        output.flush()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="assembly emission benchmark")
+    parser.add_argument("--instructions", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    source = generate_program(args.instructions).encode()
+    files = FileTable()
+    ir_gen = IRGen(
+        Parser(
+            Lexer(
+                source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+            ).stream()
+        ).parse()
+    )
+    ir_gen.generate()
+    linear_code = LinearLowering(
+        ir_gen.code, Aarch64Backend().fits_immediate_operand
+    ).run()
+
+    print(f"{'sink':>8} {'seconds':>9} {'peak MB':>9}")
+
+    elapsed, peak = emit(linear_code, io.StringIO)
+    print(f"{'memory':>8} {elapsed:>9.3f} {peak / 1e6:>9.1f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, "bench.s")
+        elapsed, peak = emit(
+            linear_code, lambda: open(output_path, "w", buffering=1 << 16)
+        )
+
+    print(f"{'file':>8} {elapsed:>9.3f} {peak / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
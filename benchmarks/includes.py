@@ -0,0 +1,74 @@
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.lexer import Lexer
+from compiler.preprocessor import Preprocessor
+from compiler.resolver import IncludeResolver
+
+FUNCTION_TEMPLATE = "fn function_{0}() int {{\n    return {0} + 1\n}}\n"
+
+
+def write_chained(directory: pathlib.Path, files: int) -> pathlib.Path:
+    for i in range(files):
+        include = f'include "file_{i + 1}.pasm"\n' if i + 1 < files else ""
+        directory.joinpath(f"file_{i}.pasm").write_text(
+            include + FUNCTION_TEMPLATE.format(i)
+        )
+
+    main = directory.joinpath("main.pasm")
+    main.write_text('include "file_0.pasm"\nfn main() void {\n}\n')
+
+    return main
+
+
+def write_fan_out(directory: pathlib.Path, files: int) -> pathlib.Path:
+    includes = []
+
+    for i in range(files):
+        directory.joinpath(f"file_{i}.pasm").write_text(FUNCTION_TEMPLATE.format(i))
+        includes.append(f'include "file_{i}.pasm"\n')
+
+    main = directory.joinpath("main.pasm")
+    main.write_text("".join(includes) + "fn main() void {\n}\n")
+
+    return main
+
+
+def preprocess(main: pathlib.Path) -> tuple[int, int]:
+    source = main.read_bytes()
+    files = FileTable()
+    lexer = Lexer(source, Diagnoster(files, files.add(main, source)))
+    resolver = IncludeResolver()
+
+    tokens = Preprocessor(lexer.stream(), [main], None, resolver).preprocess_tokens()
+
+    return len(tokens), resolver.stat_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="include expansion benchmark")
+    parser.add_argument("--files", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'layout':>8} {'files':>6} {'tokens':>8} {'stats':>6} {'seconds':>9}")
+
+    for layout, write in [("chained", write_chained), ("fan-out", write_fan_out)]:
+        with tempfile.TemporaryDirectory() as directory:
+            main = write(pathlib.Path(directory), args.files)
+
+            start = time.perf_counter()
+            tokens, stats = preprocess(main)
+            elapsed = time.perf_counter() - start
+
+            print(f"{layout:>8} {args.files:>6} {tokens:>8} {stats:>6} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from watch import Watcher, WatchedUnit
+
+FUNCTION_TEMPLATE = (
+    "fn function_{0}(a int, b int) int {{\n    return a * {1} + b - {0}\n}}\n"
+)
+
+
+def write_library(directory: pathlib.Path, functions: int):
+    directory.joinpath("library.pasm").write_text(
+        "".join(FUNCTION_TEMPLATE.format(i, 1) for i in range(functions))
+    )
+
+
+def write_main(directory: pathlib.Path, functions: int, edited: int) -> pathlib.Path:
+    main = directory / "main.pasm"
+    main.write_text(
+        'include "library.pasm"\n'
+        + "".join(
+            FUNCTION_TEMPLATE.format(i, edited if i == functions else 1)
+            for i in range(functions, functions + 10)
+        )
+        + f"fn main() int {{\n    return function_0(1, 2)\n}}\n"
+    )
+
+    return main
+
+
+def build(watcher: Watcher, unit: WatchedUnit) -> float:
+    start = time.perf_counter()
+
+    # Build summaries go to stderr, they are not part of the measurement
+    with contextlib.redirect_stderr(io.StringIO()):
+        watcher.build(unit)
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="incremental rebuild benchmark")
+    parser.add_argument("--functions", type=int, default=5000)
+    parser.add_argument("-O", dest="optimization_level", type=int, default=0)
+    args = parser.parse_args()
+
+    options = argparse.Namespace(
+        include_paths=[], optimization_level=args.optimization_level, exported=[]
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        directory = pathlib.Path(directory)
+        write_library(directory, args.functions)
+        main = write_main(directory, args.functions, 1)
+        unit = WatchedUnit(main, str(directory / "main.s"))
+        watcher = Watcher(options, [unit])
+
+        cold = build(watcher, unit)
+
+        # Edit one function of the main file, the library is left alone
+        time.sleep(0.01)
+        write_main(directory, args.functions, 2)
+        changed = len(watcher.poll())
+        incremental = build(watcher, unit)
+
+        fresh_unit = WatchedUnit(main, str(directory / "fresh.s"))
+        fresh = build(Watcher(options, [fresh_unit]), fresh_unit)
+        same = (directory / "main.s").read_text() == (directory / "fresh.s").read_text()
+
+        print(f"functions        : {args.functions + 11}")
+        print(f"files changed    : {changed}")
+        print(f"cold build       : {cold:.3f}s")
+        print(f"incremental build: {incremental:.3f}s")
+        print(f"speedup          : {fresh / incremental:.2f}x")
+        print(f"same output      : {same}")
+        print(f"statements       : {watcher.parsed} parsed, {watcher.reused} reused")
+        print(
+            f"functions        : {unit.functions.misses} generated, {unit.functions.hits} reused"
+        )
+
+
+if __name__ == "__main__":
+    main()
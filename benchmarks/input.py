@@ -0,0 +1,60 @@
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.errors import Diagnoster
+from compiler.lexer import Lexer
+from compiler.source import FileTable, read_source
+from lexer import generate_source
+
+
+def lex_file(path: pathlib.Path, mapped: bool, trace: bool) -> tuple[int, float, int]:
+    if trace:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+
+    source = read_source(path) if mapped else path.read_bytes()
+    files = FileTable()
+    count = 0
+
+    # Tokens are dropped as they come, only the source itself stays alive
+    for _ in Lexer(source, Diagnoster(files, files.add(path, source))).stream():
+        count += 1
+
+    elapsed = time.perf_counter() - start
+    peak = 0
+
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return count, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="source input benchmark")
+    parser.add_argument("--size", type=int, default=100 << 20)
+    # Tracing slows lexing down several times, so it is only done on request
+    parser.add_argument("--trace", action="store_true", default=False)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory) / "bench.pasm"
+        path.write_text(generate_source(args.size))
+
+        print(f"{'input':>6} {'tokens':>10} {'seconds':>9} {'peak MB':>9}")
+
+        for name, mapped in [("read", False), ("mmap", True)]:
+            count, elapsed, peak = lex_file(path, mapped, args.trace)
+            peak_text = f"{peak / 1e6:.1f}" if args.trace else "-"
+            print(f"{name:>6} {count:>10} {elapsed:>9.3f} {peak_text:>9}")
+
+
+if __name__ == "__main__":
+    main()
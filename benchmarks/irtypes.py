@@ -0,0 +1,70 @@
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.ast import Type
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.ir.code import *
+from compiler.ir.verify import IRVerifier
+
+
+def build_expression(operands: int, diagnoster: Diagnoster) -> IRValue:
+    rng = random.Random(0)
+    operations = [IRAdd, IRSub, IRMul, IRDiv]
+
+    value = IRInteger(rng.randint(1, 1000), diagnoster)
+
+    for _ in range(operands - 1):
+        value = rng.choice(operations)(
+            value, IRInteger(rng.randint(1, 1000), diagnoster), diagnoster
+        )
+
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ir type computation benchmark")
+    parser.add_argument("--operands", type=int, nargs="+", default=[10, 1_000, 100_000])
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args()
+
+    files = FileTable()
+    diagnoster = Diagnoster(files, files.add(pathlib.Path("bench.pasm")))
+
+    print(f"{'operands':>9} {'build':>9} {f'{args.queries} types':>12} {'verify':>9}")
+
+    for operands in args.operands:
+        start = time.perf_counter()
+        value = build_expression(operands, diagnoster)
+        build_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.queries):
+            assert value.get_type() == Type.Integer
+        type_elapsed = time.perf_counter() - start
+
+        code = IRCode(diagnoster)
+        code.add_block(
+            IRBlock(
+                "main",
+                IRBlockSignature([], Type.Integer),
+                [IRReturn(value, diagnoster)],
+            )
+        )
+
+        start = time.perf_counter()
+        IRVerifier(code).run()
+        verify_elapsed = time.perf_counter() - start
+
+        print(
+            f"{operands:>9} {build_elapsed:>9.3f} {type_elapsed:>12.6f} {verify_elapsed:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
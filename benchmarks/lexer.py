@@ -0,0 +1,75 @@
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.lexer import Lexer
+
+SIZES = [1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20, 50 << 20]
+
+FUNCTION_TEMPLATE = """fn function_{0}(a int, b float) int {{
+    return 1 + {0} * 3 - 4 / 2
+}}
+
+fn caller_{0}() void {{
+    function_{0}(1, 2.5)
+    print("function number {0}")
+}}
+
+"""
+
+
+def generate_source(size: int) -> str:
+    chunks = []
+    total = 0
+    i = 0
+
+    while total < size:
+        chunk = FUNCTION_TEMPLATE.format(i)
+        chunks.append(chunk)
+        total += len(chunk)
+        i += 1
+
+    return "".join(chunks)[:size].rsplit("\n\n", 1)[0] + "\n"
+
+
+def format_size(size: int) -> str:
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return f"{size}{unit}"
+        size //= 1024
+
+    return f"{size}GB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="lexer throughput benchmark")
+    parser.add_argument("--max-size", type=int, default=SIZES[-1])
+    args = parser.parse_args()
+
+    print(f"{'input':>8} {'tokens':>10} {'seconds':>9} {'tokens/sec':>12}")
+
+    for size in SIZES:
+        if size > args.max_size:
+            break
+
+        source = generate_source(size).encode()
+
+        start = time.perf_counter()
+        files = FileTable()
+        tokens = Lexer(
+            source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+        ).tokenize()
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{format_size(size):>8} {len(tokens):>10} {elapsed:>9.3f} {len(tokens) / elapsed:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import gc
+import pathlib
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.ast import *
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.ir.code import *
+from compiler.ir.gen import IRGen
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+def generate_program(nodes: int, operands: int) -> str:
+    """
+    Functions returning a chain of operations over their parameters, integers
+    and calls to the previous function, about 2 * operands AST nodes each
+    """
+
+    chunks = ["fn function_0(a int, b int) int {\n    return a + b\n}\n\n"]
+    operators = ["+", "-", "*", "+"]
+
+    for i in range(1, nodes // (2 * operands) + 1):
+        terms = []
+
+        for j in range(operands):
+            match j % 3:
+                case 0:
+                    terms.append("a")
+                case 1:
+                    terms.append(str(j))
+                case _:
+                    terms.append(f"function_{i - 1}(b)")
+
+        body = " ".join(
+            f"{term} {operators[j % 4]}" for j, term in enumerate(terms[:-1])
+        )
+        chunks.append(
+            f"fn function_{i}(a int, b int) int {{\n    return {body} {terms[-1]}\n}}\n\n"
+        )
+
+    return "".join(chunks)
+
+
+def count_ast_nodes(program: Program) -> int:
+    count = 0
+    stack = list(program.body)
+
+    while len(stack) != 0:
+        node = stack.pop()
+        count += 1
+
+        match node:
+            case funcdef if isinstance(funcdef, FunctionDefinition):
+                stack.append(funcdef.name)
+                stack.extend(funcdef.body)
+            case returnstmt if isinstance(returnstmt, ReturnStatement):
+                stack.append(returnstmt.value)
+            case binop if isinstance(binop, BinaryOperation):
+                stack.append(binop.lhs)
+                stack.append(binop.rhs)
+            case call if isinstance(call, Call):
+                stack.append(call.callable)
+                stack.extend(call.arguments)
+            case _:
+                ...
+
+    return count
+
+
+def count_ir_nodes(code: IRCode) -> int:
+    count = 0
+    stack = [instruction for block in code.blocks for instruction in block.instructions]
+
+    while len(stack) != 0:
+        node = stack.pop()
+        count += 1
+
+        match node:
+            case ret if isinstance(ret, IRReturn):
+                stack.append(ret.value)
+            case binop if isinstance(binop, IRBinaryOperation):
+                stack.append(binop.lhs)
+                stack.append(binop.rhs)
+            case call if isinstance(call, IRCall):
+                stack.append(call.callable)
+                stack.extend(call.arguments)
+            case _:
+                ...
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ast and ir memory benchmark")
+    parser.add_argument("--nodes", type=int, default=1_000_000)
+    parser.add_argument("--operands", type=int, default=100)
+    args = parser.parse_args()
+
+    source = generate_program(args.nodes, args.operands).encode()
+    gc.collect()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    files = FileTable()
+    program = Parser(
+        Lexer(
+            source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+        ).stream()
+    ).parse()
+    ast_bytes, ast_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    ir_gen = IRGen(program)
+    ir_gen.generate()
+    total_bytes, ir_peak = tracemalloc.get_traced_memory()
+
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    ast_nodes = count_ast_nodes(program)
+    ir_nodes = count_ir_nodes(ir_gen.code)
+    ir_bytes = total_bytes - ast_bytes
+
+    print(f"ast nodes         : {ast_nodes}")
+    print(f"ir nodes          : {ir_nodes}")
+    print(f"ast bytes/node    : {ast_bytes / ast_nodes:.1f}")
+    print(f"ast peak/node     : {ast_peak / ast_nodes:.1f}")
+    print(f"ir bytes/node     : {ir_bytes / ir_nodes:.1f}")
+    print(f"ir peak/node      : {(ir_peak - ast_bytes) / ir_nodes:.1f}")
+    print(f"seconds (traced)  : {elapsed:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.asm.backends.aarch64 import Aarch64Backend
+from compiler.asm.gen import ASMGen
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.ir.gen import IRGen
+from compiler.ir.linear import LinearLowering
+from compiler.ir.optimize import Optimizer
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+def generate_expression(rng: random.Random, operands: int, isfloat: bool) -> str:
+    terms = [
+        f"{rng.randint(1, 64)}.5" if isfloat else str(rng.randint(1, 1000))
+        for _ in range(operands)
+    ]
+    operators = [rng.choice("+-*/") for _ in range(operands - 1)]
+
+    return " ".join(t for pair in zip(terms, operators + [""]) for t in pair).strip()
+
+
+def generate_program(functions: int, operands: int) -> str:
+    rng = random.Random(0)
+    chunks = []
+
+    for i in range(functions):
+        isfloat = i % 2 == 1
+        chunks.append(
+            f"fn function_{i}() {'float' if isfloat else 'int'} {{\n"
+            f"    return {generate_expression(rng, operands, isfloat)}\n"
+            "}\n\n"
+        )
+
+    chunks.append("fn main() void {\n    function_0()\n}\n")
+
+    return "".join(chunks)
+
+
+def compile_program(source: bytes, level: int) -> tuple[int, float]:
+    files = FileTable()
+    ir_gen = IRGen(
+        Parser(
+            Lexer(
+                source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+            ).stream()
+        ).parse()
+    )
+    ir_gen.generate()
+
+    start = time.perf_counter()
+    # Every function is exported, dead function elimination would drop them
+    exported = [block.name for block in ir_gen.code.blocks]
+    Optimizer(ir_gen.code, level, exported).run()
+    backend = Aarch64Backend()
+
+    if level >= 1:
+        backend.enable_peephole()
+
+    ASMGen(
+        backend, LinearLowering(ir_gen.code, backend.fits_immediate_operand).run()
+    ).generate()
+    elapsed = time.perf_counter() - start
+
+    instructions = sum(
+        1 for line in backend.display_code().splitlines() if line.startswith("\t")
+    )
+
+    return instructions, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="optimisation level benchmark")
+    parser.add_argument("--functions", type=int, default=2_000)
+    parser.add_argument("--operands", type=int, default=20)
+    args = parser.parse_args()
+
+    source = generate_program(args.functions, args.operands).encode()
+
+    print(f"{'level':>6} {'instructions':>13} {'seconds':>9}")
+
+    for level in [0, 1, 2]:
+        instructions, elapsed = compile_program(source, level)
+        print(f"{'-O' + str(level):>6} {instructions:>13} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.asm.backends.aarch64 import Aarch64Backend
+from compiler.asm.gen import ASMGen
+from compiler.errors import Diagnoster
+from compiler.ir.gen import IRGen
+from compiler.ir.linear import LinearLowering
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+from compiler.source import FileTable
+
+
+def generate_program(functions: int, operands: int) -> str:
+    chunks = ["fn function_0(a int, b int) int {\n    return a + b\n}\n\n"]
+    operators = ["+", "-", "*", "+"]
+
+    for i in range(1, functions):
+        terms = ["a", "b", f"function_{i - 1}(a, b)"] * operands
+        body = " ".join(
+            f"{term} {operators[j % 4]}" for j, term in enumerate(terms[: operands - 1])
+        )
+        chunks.append(
+            f"fn function_{i}(a int, b int) int {{\n    return {body} {i}\n}}\n\n"
+        )
+
+    chunks.append(f"fn main() int {{\n    return function_{functions - 1}(1, 2)\n}}\n")
+
+    return "".join(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parallel code generation benchmark")
+    parser.add_argument("--functions", type=int, default=20_000)
+    parser.add_argument("--operands", type=int, default=8)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    source = generate_program(args.functions, args.operands).encode()
+    files = FileTable()
+    ir_gen = IRGen(
+        Parser(
+            Lexer(
+                source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+            ).stream()
+        ).parse()
+    )
+    ir_gen.generate()
+    linear_code = LinearLowering(
+        ir_gen.code, Aarch64Backend().fits_immediate_operand
+    ).run()
+
+    print(f"cpus: {os.cpu_count()}")
+    print(f"{'jobs':>5} {'seconds':>9} {'speedup':>8} {'same output':>12}")
+
+    baseline = None
+
+    for jobs in args.jobs:
+        backend = Aarch64Backend()
+        backend.enable_peephole()
+
+        start = time.perf_counter()
+        ASMGen(backend, linear_code, jobs).generate()
+        elapsed = time.perf_counter() - start
+
+        output = backend.display_code()
+
+        if baseline == None:
+            baseline = (output, elapsed)
+
+        print(
+            f"{jobs:>5} {elapsed:>9.3f} {baseline[1] / elapsed:>8.2f} {str(output == baseline[0]):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
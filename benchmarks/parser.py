@@ -0,0 +1,60 @@
+import argparse
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+FUNCTION_COUNTS = [10_000, 20_000, 50_000, 100_000]
+
+FUNCTION_TEMPLATE = """fn function_{0}(a int, b int) int {{
+    return 1 + {0} * 3 - 4 / 2 * function_{1}(7, 8 + 9)
+}}
+
+"""
+
+
+def generate_program(functions: int) -> str:
+    chunks = ["fn function_0(a int, b int) int {\n    return 0\n}\n\n"]
+
+    for i in range(1, functions):
+        chunks.append(FUNCTION_TEMPLATE.format(i, i - 1))
+
+    chunks.append("fn main() void {\n    function_%d(1, 2)\n}\n" % (functions - 1))
+
+    return "".join(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parser throughput benchmark")
+    parser.add_argument("--max-functions", type=int, default=FUNCTION_COUNTS[-1])
+    args = parser.parse_args()
+
+    print(f"{'functions':>10} {'tokens':>10} {'seconds':>9} {'tokens/sec':>12}")
+
+    for functions in FUNCTION_COUNTS:
+        if functions > args.max_functions:
+            break
+
+        source = generate_program(functions).encode()
+        files = FileTable()
+        tokens = Lexer(
+            source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+        ).tokenize()
+
+        start = time.perf_counter()
+        Parser(tokens).parse()
+        elapsed = time.perf_counter() - start
+
+        print(
+            f"{functions:>10} {len(tokens):>10} {elapsed:>9.3f} {len(tokens) / elapsed:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
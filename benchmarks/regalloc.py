@@ -0,0 +1,87 @@
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.asm.backends.aarch64 import Aarch64Backend
+from compiler.asm.gen import ASMGen
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.ir.gen import IRGen
+from compiler.ir.linear import LinearLowering
+from compiler.lexer import Lexer
+from compiler.parser import Parser
+
+
+def generate_expression(rng: random.Random, operands: int) -> str:
+    terms = [
+        "leaf()" if rng.random() < 0.2 else str(rng.randint(1, 5000))
+        for _ in range(operands)
+    ]
+    operators = [rng.choice("+-*/") for _ in range(operands - 1)]
+
+    return " ".join(t for pair in zip(terms, operators + [""]) for t in pair).strip()
+
+
+def generate_program(functions: int, operands: int) -> str:
+    rng = random.Random(0)
+    chunks = ["fn leaf() int {\n    return 7\n}\n\n"]
+
+    for i in range(functions):
+        chunks.append(
+            f"fn function_{i}() int {{\n"
+            f"    return {generate_expression(rng, operands)}\n"
+            "}\n\n"
+        )
+
+    chunks.append("fn main() void {\n    function_0()\n}\n")
+
+    return "".join(chunks)
+
+
+def compile_program(source: bytes) -> tuple[int, float]:
+    files = FileTable()
+    ir_gen = IRGen(
+        Parser(
+            Lexer(
+                source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+            ).stream()
+        ).parse()
+    )
+    ir_gen.generate()
+
+    start = time.perf_counter()
+    backend = Aarch64Backend()
+    ASMGen(
+        backend, LinearLowering(ir_gen.code, backend.fits_immediate_operand).run()
+    ).generate()
+    elapsed = time.perf_counter() - start
+
+    instructions = sum(
+        1 for line in backend.display_code().splitlines() if line.startswith("\t")
+    )
+
+    return instructions, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="register allocation benchmark")
+    parser.add_argument("--functions", type=int, default=2_000)
+    parser.add_argument("--operands", type=int, nargs="+", default=[2, 4, 8, 12])
+    args = parser.parse_args()
+
+    print(f"{'operands':>9} {'instructions':>13} {'per operand':>12} {'seconds':>9}")
+
+    for operands in args.operands:
+        instructions, elapsed = compile_program(
+            generate_program(args.functions, operands).encode()
+        )
+        per_operand = instructions / (args.functions * operands)
+        print(f"{operands:>9} {instructions:>13} {per_operand:>12.2f} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import pathlib
+import sys
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
+
+from compiler.errors import Diagnoster
+from compiler.source import FileTable
+from compiler.lexer import Lexer
+from lexer import generate_source
+
+
+def main():
+    parser = argparse.ArgumentParser(description="token stream memory benchmark")
+    parser.add_argument("--size", type=int, default=4 << 20)
+    args = parser.parse_args()
+
+    source = generate_source(args.size).encode()
+
+    tracemalloc.start()
+    files = FileTable()
+    tokens = Lexer(
+        source, Diagnoster(files, files.add(pathlib.Path("bench.pasm"), source))
+    ).tokenize()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"tokens          : {len(tokens)}")
+    print(f"retained bytes  : {current}")
+    print(f"peak bytes      : {peak}")
+    print(f"bytes per token : {current / len(tokens):.1f}")
+
+
+if __name__ == "__main__":
+    main()
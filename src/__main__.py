@@ -1,65 +1,61 @@
-import platform
+import pathlib
 import sys
+import time
 import cli
-from compiler.errors import Diagnoster
-import compiler.preprocessor
-import compiler.lexer
-import compiler.parser
-import compiler.ir.gen
-import compiler.asm.gen
-import compiler.asm.backends.aarch64
-
-from pprint import PrettyPrinter
-
-pprinter = PrettyPrinter()
+import driver
+import watch
+import compiler.resolver
 
 args = cli.parse_args()
 
-if not args.file_path.is_file():
-    print(f"{args.file_path} is not a file", file=sys.stderr)
-    exit(1)
+for file_path in args.file_paths:
+    if not file_path.is_file():
+        print(f"{file_path} is not a file", file=sys.stderr)
+        exit(1)
 
-with open(args.file_path, "r") as f:
-    lexer = compiler.lexer.Lexer(list(f.read()), Diagnoster(args.file_path))
+# Every input writes <stem>.s, two inputs with the same stem would overwrite
+# each other's assembly
+output_paths = {}
 
-tokens = lexer.tokenize()
-tokens = compiler.preprocessor.Preprocessor(
-    tokens, [args.file_path]
-).preprocess_tokens()
+for file_path in args.file_paths:
+    output_path = args.output or str(
+        (args.output_dir or pathlib.Path()) / (file_path.stem + ".s")
+    )
 
-if args.emit_outputs:
-    print("Tokens :")
-    pprinter.pprint(tokens)
-    print()
+    if output_path in output_paths:
+        print(
+            f"{output_paths[output_path]} and {file_path} both compile to {output_path}",
+            file=sys.stderr,
+        )
+        exit(1)
 
-parser = compiler.parser.Parser(tokens)
-program = parser.parse()
+    output_paths[output_path] = file_path
 
-if args.emit_outputs:
-    print("AST :")
-    pprinter.pprint(program)
-    print()
+inputs = [(file_path, output_path) for output_path, file_path in output_paths.items()]
 
-ir_gen = compiler.ir.gen.IRGen(program)
-ir_gen.generate()
+if args.watch:
+    watch.watch(args, inputs)
+elif len(inputs) == 1:
+    file_path, output_path = inputs[0]
 
-if args.emit_outputs:
-    print("IR :")
-    pprinter.pprint(ir_gen.code)
-    print()
+    driver.compile_file(
+        args,
+        file_path,
+        output_path,
+        driver.create_token_cache(args),
+        compiler.resolver.IncludeResolver(args.include_paths),
+        args.jobs,
+    )
+else:
+    start = time.perf_counter()
+    total = 0.0
 
-match platform.machine():
-    case "aarch64":
-        asm_backend = compiler.asm.backends.aarch64.Aarch64Backend()
-        asm_gen = compiler.asm.gen.ASMGen(asm_backend, ir_gen.code)
-        asm_gen.generate()
+    for file_path, elapsed in driver.compile_files(args, inputs):
+        total += elapsed
 
-        if args.emit_outputs:
-            print("Assembly :")
-            print(asm_backend.display_code())
+        print(f"{file_path}: {elapsed:.3f}s", file=sys.stderr)
 
-        with open(args.file_path.stem + ".s", "w") as f:
-            f.write(asm_backend.display_code())
-    case m:
-        print(m, "is not a supported machine yet")
-        exit(1)
+    print(
+        f"{len(inputs)} files: {total:.3f}s compiling, {time.perf_counter() - start:.3f}s total",
+        file=sys.stderr,
+    )
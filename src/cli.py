@@ -1,11 +1,79 @@
 import argparse
 import pathlib
+from compiler.cache import default_cache_directory
 
 
 def parse_args():
     parser = argparse.ArgumentParser(prog="pasm")
 
-    parser.add_argument("file_path", type=pathlib.Path)
+    parser.add_argument("file_paths", type=pathlib.Path, nargs="*", metavar="file_path")
+    parser.add_argument("--manifest", type=pathlib.Path, default=None)
     parser.add_argument("--emit-outputs", action="store_true", default=False)
+    parser.add_argument("-o", "--output", default=None)
+    parser.add_argument("--output-dir", type=pathlib.Path, default=None)
+    parser.add_argument(
+        "-O",
+        dest="optimization_level",
+        type=int,
+        default=0,
+        choices=[0, 1, 2],
+        metavar="LEVEL",
+        help="optimization level 0, 1 or 2, written -O1 or -O 1 (default: 0)",
+    )
+    parser.add_argument(
+        "-I",
+        "--include-path",
+        dest="include_paths",
+        action="append",
+        type=pathlib.Path,
+        default=[],
+    )
+    parser.add_argument(
+        "--export", dest="exported", action="append", metavar="NAME", default=[]
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N")
+    parser.add_argument("-v", "--verbose", action="store_true", default=False)
+    parser.add_argument(
+        "--cache-dir", type=pathlib.Path, default=default_cache_directory()
+    )
+    parser.add_argument("--no-cache", action="store_true", default=False)
+    parser.add_argument("--watch", action="store_true", default=False)
 
-    return parser.parse_args()
+    args = parser.parse_args()
+
+    if args.manifest != None:
+        try:
+            args.file_paths += read_manifest(args.manifest)
+        except OSError as e:
+            parser.error(f"cannot read manifest {args.manifest}: {e.strerror}")
+
+    if len(args.file_paths) == 0:
+        parser.error("no input files")
+
+    if len(args.file_paths) > 1 and args.output != None:
+        parser.error("-o/--output needs a single input, use --output-dir")
+
+    if args.watch and args.emit_outputs:
+        parser.error("--emit-outputs cannot be used with --watch")
+
+    return args
+
+
+def read_manifest(manifest_path: pathlib.Path) -> list[pathlib.Path]:
+    """
+    A manifest lists one source file per line, relative to the manifest
+    itself. Blank lines and lines starting with # are skipped.
+    """
+
+    file_paths = []
+
+    with open(manifest_path) as f:
+        for line in f:
+            line = line.strip()
+
+            if len(line) == 0 or line.startswith("#"):
+                continue
+
+            file_paths.append(manifest_path.parent / line)
+
+    return file_paths
@@ -1,41 +1,111 @@
 from dataclasses import dataclass
 from .base import ASMBackend
-from ..code import ASMInstruction, ASMReturn
-from ...ir.code import *
+from ..code import *
+from ...ir.linear import LinearBlock
 
 
 @dataclass()
 class Aarch64Backend(ASMBackend):
     def add_entry_point(self):
-        self.code.text_segment += ".global _start\n"
-        self.code.text_segment += "_start:\n"
-        self.code.text_segment += "\tbl main\n"
-        self.code.text_segment += "\tmov w8, #93\n"
-        self.code.text_segment += "\tmov w0, wzr\n"
-        self.code.text_segment += "\tsvc #0\n"
+        self.code.write(".text\n")
+        self.code.write(".global _start\n")
+        self.code.write("_start:\n")
+        self.code.write("\tbl main\n")
+        self.code.write("\tmov w8, #93\n")
+        self.code.write("\tmov w0, wzr\n")
+        self.code.write("\tsvc #0\n")
 
     def initialize_data_segment(self):
+        self.code.write("\n")
+
+        if len(self.code.string_literals) != 0:
+            # Read-only, mergeable NUL-terminated strings, so the linker can also
+            # share identical literals across object files
+            self.code.write('.section .rodata.str1.1,"aMS",@progbits,1\n')
+
         for i, string_literal in enumerate(self.code.string_literals):
-            self.code.data_segement += f"str{i}:\n"
-            self.code.data_segement += f"\t.asciz \"{''.join(string_literal)}\"\n"
+            self.code.write(f"str{i}:\n")
+            self.code.write(f'\t.asciz "{string_literal}"\n')
 
-    def add_label_start(self, block: IRBlock):
-        self.code.text_segment += f".global {block.name}\n"
-        self.code.text_segment += f"{block.name}:\n"
+    def add_label_start(self, block: LinearBlock):
+        self.code.write(f".global {block.name}\n")
+        self.code.write(f"{block.name}:\n")
 
-    def add_label_end(self, block: IRBlock):
-        if not block.returned and block.signature.return_type == Type.Void:
-            self.add_instruction(ASMReturn())
+    def add_label_end(self, block: LinearBlock):
+        # The epilogue and ret are emitted by the code generator with the frame,
+        # only the instructions held back for the peephole optimizer are left
+        if self.peephole != None:
+            for instruction in self.peephole.flush():
+                self.write_instruction(instruction)
 
     def add_instruction(self, instruction: ASMInstruction):
-        self.code.text_segment += f"\t{instruction.to_aarch64()}\n"
+        if self.peephole != None:
+            self.peephole.add(instruction)
+        else:
+            self.write_instruction(instruction)
+
+    def write_instruction(self, instruction: ASMInstruction):
+        self.code.write(f"\t{instruction.to_aarch64()}\n")
 
     def add_string_literal(self, value: str):
-        self.code.string_literals.append(list(value))
+        self.code.string_literals.append(value)
 
     def repr_register(self, number: int, isfloat: bool) -> str:
         return f"d{number}" if isfloat else f"x{number}"
 
+    def repr_stack_slot(self, offset: int) -> str:
+        return f"[sp, #{offset}]"
+
+    def repr_link_register(self) -> str:
+        return "x30"
+
+    def repr_frame_registers(self) -> list[str]:
+        return ["sp", "x29", "x30"]
+
+    def caller_saved_registers(self, isfloat: bool) -> list[int]:
+        # x16/x17 and d30/d31 are kept out as scratch registers, x18 is reserved
+        # by the platform. Argument registers come last so temporaries leave them
+        # free for the values headed into a call
+        if isfloat:
+            return list(range(16, 30)) + list(range(0, 8))
+
+        return list(range(8, 16)) + list(range(0, 8))
+
+    def callee_saved_registers(self, isfloat: bool) -> list[int]:
+        if isfloat:
+            return list(range(8, 16))
+
+        return list(range(19, 29))
+
+    def scratch_registers(self, isfloat: bool) -> list[int]:
+        return [30, 31] if isfloat else [16, 17]
+
+    def argument_registers(self, isfloat: bool) -> list[int]:
+        return list(range(0, 8))
+
+    def return_register(self, isfloat: bool) -> int:
+        return 0
+
+    def add_frame_setup(self, locals_size: int):
+        self.add_instruction(ASMStorePair("x29", "x30", "[sp, #-16]!"))
+        self.add_instruction(ASMMove("x29", "sp"))
+
+        if locals_size > 4095:
+            self.add_instruction(ASMMove("x16", f"#{locals_size}"))
+            self.add_instruction(ASMSub(False, "sp", "sp", "x16"))
+        elif locals_size != 0:
+            self.add_instruction(ASMSub(False, "sp", "sp", f"#{locals_size}"))
+
+    def add_frame_teardown(self, locals_size: int):
+        if locals_size != 0:
+            self.add_instruction(ASMMove("sp", "x29"))
+
+        self.add_instruction(ASMLoadPair("x29", "x30", "[sp], #16"))
+
+    def fits_immediate_operand(self, value: int) -> bool:
+        # add and sub take an unsigned 12 bit immediate
+        return 0 <= value < 1 << 12
+
     def repr_integer(self, value: int) -> str:
         return f"#{value}"
 
@@ -43,14 +113,4 @@ class Aarch64Backend(ASMBackend):
         return f"#{value}"
 
     def display_code(self) -> str:
-        result = ""
-
-        result += ".text\n"
-        result += "".join(self.code.text_segment)
-
-        result += "\n"
-
-        result += ".data\n"
-        result += "".join(self.code.data_segement)
-
-        return result
+        return self.code.output.getvalue()
@@ -1,11 +1,34 @@
 from dataclasses import dataclass, field
 from ..code import ASMCode, ASMInstruction
-from ...ir.code import IRBlock, IRValue
+from ..peephole import PeepholeOptimizer
+from ...ir.linear import LinearBlock
 
 
 @dataclass()
 class ASMBackend:
     code: ASMCode = field(default_factory=ASMCode)
+    peephole: PeepholeOptimizer | None = None
+
+    def enable_peephole(self):
+        def registers(numbers: list[int], isfloat: bool) -> set[str]:
+            return {self.repr_register(number, isfloat) for number in numbers}
+
+        call_reads = set()
+        call_writes = {self.repr_link_register()}
+        return_reads = set(self.repr_frame_registers())
+
+        for isfloat in (False, True):
+            call_reads |= registers(self.argument_registers(isfloat), isfloat)
+            call_writes |= registers(
+                self.caller_saved_registers(isfloat) + self.scratch_registers(isfloat),
+                isfloat,
+            )
+            return_reads |= registers(
+                self.callee_saved_registers(isfloat) + [self.return_register(isfloat)],
+                isfloat,
+            )
+
+        self.peephole = PeepholeOptimizer(call_reads, call_writes, return_reads)
 
     def add_entry_point(self):
         ...
@@ -13,10 +36,10 @@ class ASMBackend:
     def initialize_data_segment(self):
         ...
 
-    def add_label_start(self, block: IRBlock):
+    def add_label_start(self, block: LinearBlock):
         ...
 
-    def add_label_end(self, block: IRBlock):
+    def add_label_end(self, block: LinearBlock):
         ...
 
     def add_instruction(self, instruction: ASMInstruction):
@@ -28,6 +51,39 @@ class ASMBackend:
     def repr_register(self, number: int, isfloat: bool) -> str:
         ...
 
+    def repr_stack_slot(self, offset: int) -> str:
+        ...
+
+    def repr_link_register(self) -> str:
+        ...
+
+    def repr_frame_registers(self) -> list[str]:
+        ...
+
+    def caller_saved_registers(self, isfloat: bool) -> list[int]:
+        ...
+
+    def callee_saved_registers(self, isfloat: bool) -> list[int]:
+        ...
+
+    def scratch_registers(self, isfloat: bool) -> list[int]:
+        ...
+
+    def argument_registers(self, isfloat: bool) -> list[int]:
+        ...
+
+    def return_register(self, isfloat: bool) -> int:
+        ...
+
+    def add_frame_setup(self, locals_size: int):
+        ...
+
+    def add_frame_teardown(self, locals_size: int):
+        ...
+
+    def fits_immediate_operand(self, value: int) -> bool:
+        ...
+
     def repr_integer(self, value: int) -> str:
         ...
 
@@ -1,11 +1,43 @@
+import io
+import math
+import struct
 from dataclasses import dataclass, field
+from typing import TextIO
 from ..ir.code import *
 
 
+def is_fmov_immediate(value: float) -> bool:
+    # fmov only encodes +-n/16 * 2^r with 16 <= n <= 31 and -3 <= r <= 4
+    if value == 0 or not math.isfinite(value):
+        return False
+
+    mantissa, exponent = math.frexp(abs(value))
+
+    return (mantissa * 32).is_integer() and -3 <= exponent - 1 <= 4
+
+
+def is_register(operand: str) -> bool:
+    return not operand.startswith("#")
+
+
+def address_base(address: str) -> str:
+    return address[1:].split(",")[0].split("]")[0]
+
+
+def is_writeback(address: str) -> bool:
+    return address.endswith("!") or "]," in address
+
+
 class ASMInstruction:
     def to_aarch64(self) -> str:
         ...
 
+    def reads(self) -> list[str]:
+        return []
+
+    def writes(self) -> list[str]:
+        return []
+
 
 @dataclass()
 class ASMCall(ASMInstruction):
@@ -15,6 +47,14 @@ class ASMCall(ASMInstruction):
         return f"bl {self.label_name}"
 
 
+@dataclass()
+class ASMBranch(ASMInstruction):
+    label_name: str
+
+    def to_aarch64(self) -> str:
+        return f"b {self.label_name}"
+
+
 @dataclass()
 class ASMReturn(ASMInstruction):
     def to_aarch64(self) -> str:
@@ -23,27 +63,127 @@ class ASMReturn(ASMInstruction):
 
 @dataclass()
 class ASMMove(ASMInstruction):
-    register_number: int
+    register: str
     value: str
 
     def to_aarch64(self) -> str:
-        if "." in self.value:
-            instruction = "fmov"
-            register_type = "d"
-        else:
-            instruction = "mov"
-            register_type = "x"
+        if self.value.startswith("#"):
+            return self.immediate_to_aarch64(self.value[1:])
 
-        return f"{instruction} {register_type}{self.register_number}, {self.value}"
+        if self.register.startswith("d") or self.value.startswith("d"):
+            return f"fmov {self.register}, {self.value}"
+
+        return f"mov {self.register}, {self.value}"
+
+    def immediate_to_aarch64(self, literal: str) -> str:
+        try:
+            value = int(literal)
+        except ValueError:
+            value = float(literal)
+
+            if value == 0 and math.copysign(1, value) > 0:
+                return f"fmov {self.register}, xzr"
+
+            if is_fmov_immediate(value):
+                return f"fmov {self.register}, #{literal}"
+
+            # Anything else is loaded from the literal pool by its bit pattern
+            bits = struct.unpack("<Q", struct.pack("<d", value))[0]
+
+            return f"ldr {self.register}, =0x{bits:016x}"
+
+        if -(1 << 16) <= value < 1 << 16:
+            return f"mov {self.register}, #{value}"
+
+        return f"ldr {self.register}, ={value}"
+
+    def reads(self) -> list[str]:
+        return [self.value] if is_register(self.value) else []
+
+    def writes(self) -> list[str]:
+        return [self.register]
 
 
 @dataclass()
 class ASMLoadAddress(ASMInstruction):
-    register_number: int
+    register: str
+    address: str
+
+    def to_aarch64(self) -> str:
+        return f"adr {self.register}, {self.address}"
+
+    def writes(self) -> list[str]:
+        return [self.register]
+
+
+@dataclass()
+class ASMLoad(ASMInstruction):
+    register: str
     address: str
 
     def to_aarch64(self) -> str:
-        return f"adr x{self.register_number}, {self.address}"
+        return f"ldr {self.register}, {self.address}"
+
+    def reads(self) -> list[str]:
+        return [address_base(self.address)]
+
+    def writes(self) -> list[str]:
+        if is_writeback(self.address):
+            return [self.register, address_base(self.address)]
+
+        return [self.register]
+
+
+@dataclass()
+class ASMStore(ASMInstruction):
+    register: str
+    address: str
+
+    def to_aarch64(self) -> str:
+        return f"str {self.register}, {self.address}"
+
+    def reads(self) -> list[str]:
+        return [self.register, address_base(self.address)]
+
+    def writes(self) -> list[str]:
+        return [address_base(self.address)] if is_writeback(self.address) else []
+
+
+@dataclass()
+class ASMLoadPair(ASMInstruction):
+    first_register: str
+    second_register: str
+    address: str
+
+    def to_aarch64(self) -> str:
+        return f"ldp {self.first_register}, {self.second_register}, {self.address}"
+
+    def reads(self) -> list[str]:
+        return [address_base(self.address)]
+
+    def writes(self) -> list[str]:
+        registers = [self.first_register, self.second_register]
+
+        if is_writeback(self.address):
+            registers.append(address_base(self.address))
+
+        return registers
+
+
+@dataclass()
+class ASMStorePair(ASMInstruction):
+    first_register: str
+    second_register: str
+    address: str
+
+    def to_aarch64(self) -> str:
+        return f"stp {self.first_register}, {self.second_register}, {self.address}"
+
+    def reads(self) -> list[str]:
+        return [self.first_register, self.second_register, address_base(self.address)]
+
+    def writes(self) -> list[str]:
+        return [address_base(self.address)] if is_writeback(self.address) else []
 
 
 class ASMBinaryOeration(ASMInstruction):
@@ -54,10 +194,17 @@ class ASMBinaryOeration(ASMInstruction):
     rhs_reg: str
 
     def to_aarch64(self) -> str:
-        if self.isfloat:
-            self.instruction = "f" + self.instruction
+        instruction = "f" + self.instruction if self.isfloat else self.instruction
+
+        return f"{instruction} {self.out_reg}, {self.lhs_reg}, {self.rhs_reg}"
+
+    def reads(self) -> list[str]:
+        return [
+            operand for operand in (self.lhs_reg, self.rhs_reg) if is_register(operand)
+        ]
 
-        return f"{self.instruction} {self.out_reg}, {self.lhs_reg}, {self.rhs_reg}"
+    def writes(self) -> list[str]:
+        return [self.out_reg]
 
 
 @dataclass()
@@ -95,9 +242,17 @@ class ASMDiv(ASMBinaryOeration):
     rhs_reg: str
     instruction: str = "div"
 
+    def to_aarch64(self) -> str:
+        # Integer division is signed, there is no plain div instruction
+        instruction = "fdiv" if self.isfloat else "sdiv"
+
+        return f"{instruction} {self.out_reg}, {self.lhs_reg}, {self.rhs_reg}"
+
 
 @dataclass()
 class ASMCode:
-    text_segment: list[str] = field(default_factory=list)
-    data_segement: list[str] = field(default_factory=list)
-    string_literals: list[list[str]] = field(default_factory=list)
+    output: TextIO = field(default_factory=io.StringIO)
+    string_literals: list[str] = field(default_factory=list)
+
+    def write(self, text: str):
+        self.output.write(text)
@@ -1,127 +1,535 @@
-from dataclasses import dataclass
+import io
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Type as ClassType
 from .backends.base import ASMBackend, ASMInstruction
 from .code import *
+from .regalloc import *
 from ..errors import ErrorKind
-from ..ir.code import *
+from ..ir.code import Type
+from ..ir.linear import LinearBlock, LinearCode, LinearInstruction, LinearOpcode
+
+BINARY_INSTRUCTIONS = {
+    LinearOpcode.Add: ASMAdd,
+    LinearOpcode.Sub: ASMSub,
+    LinearOpcode.Mul: ASMMul,
+    LinearOpcode.Div: ASMDiv,
+}
+
+# Blocks are handed to the workers in a few ranges per worker, so a range of
+# unusually large functions does not leave the other workers idle
+RANGES_PER_JOB = 4
+
+
+@dataclass()
+class FunctionCache:
+    """
+    The assembly of every function generated by the last build, keyed by the
+    linear code of the function, so a function that did not change between
+    builds is only copied to the output. Entries the next build does not use
+    are dropped once it finishes.
+    """
+
+    entries: dict[tuple, tuple[str, dict[str, int]]] = field(default_factory=dict)
+    used: dict[tuple, tuple[str, dict[str, int]]] = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+
+    def get(self, key: tuple) -> tuple[str, dict[str, int]] | None:
+        entry = self.used.get(key)
+
+        if entry == None:
+            entry = self.entries.get(key)
+
+        if entry == None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.used[key] = entry
+
+        return entry
+
+    def add(self, key: tuple, entry: tuple[str, dict[str, int]]):
+        self.used[key] = entry
+
+    def finish(self):
+        self.entries = self.used
+        self.used = {}
 
 
 @dataclass()
 class ASMGen:
     backend: ASMBackend
-    ir_code: IRCode
+    code: LinearCode
+    jobs: int = 1
+    cache: FunctionCache | None = None
+    instructions: list[VirtualInstruction] = field(default_factory=list)
 
     def generate(self):
-        if self.ir_code.get_block("main") == None:
-            self.ir_code.diagnoster.error_panic(
+        if self.code.get_block("main") == None:
+            self.code.diagnoster.error_panic(
                 ErrorKind.Invalid, "program: main function is undefined"
             )
 
         self.backend.add_entry_point()
 
-        for block in self.ir_code.blocks:
-            self.backend.add_label_start(block)
+        if self.cache != None:
+            for block in self.code.blocks:
+                self.generate_cached_function(block)
 
-            for instruction in block.instructions:
-                self.backend.add_instruction(self.generate_asm_instruction(instruction))
+            self.cache.finish()
+        elif self.jobs > 1 and len(self.code.blocks) > 1:
+            self.generate_parallel()
+        else:
+            for block in self.code.blocks:
+                self.generate_function(block)
 
-            self.backend.add_label_end(block)
-
-        for string_literal in self.ir_code.string_literals:
+        for string_literal in self.code.string_literals:
             self.backend.add_string_literal(string_literal.value)
 
         self.backend.initialize_data_segment()
 
-    def generate_asm_instruction(self, instruction: IRInstruction) -> ASMInstruction:
-        match instruction:
-            case call if isinstance(call, IRCall):
-                match call.callable:
-                    case br if isinstance(br, IRBlockReference):
-                        block = self.ir_code.blocks[br.index]
-
-                        if len(call.arguments) != len(block.signature.parameters_types):
-                            call.get_diagnoster().error_panic(
-                                ErrorKind.Invalid,
-                                f"call: expected {len(block.signature.parameters_types)} {'arguments' if len(block.signature.parameters_types) != 1 else 'argument'} got {len(call.arguments)}",
-                            )
-
-                        for i, parameter_type in enumerate(
-                            block.signature.parameters_types
-                        ):
-                            if call.arguments[i].get_type() != parameter_type:
-                                call.get_diagnoster().error_panic(
-                                    ErrorKind.Types,
-                                    f"mismatched: expected argument at position {i} to be of type {parameter_type} but got argument of type {call.arguments[i].get_type()}",
-                                )
-
-                        for i, argument in enumerate(call.arguments):
-                            self.backend.add_instruction(
-                                ASMMove(i, self.generate_value(argument))
-                            )
-
-                        return ASMCall(block.name)
-                    case _:
-                        call.get_diagnoster().error_panic(ErrorKind.Invalid, "callable")
-            case ret if isinstance(ret, IRReturn):
-                self.backend.add_instruction(ASMMove(0, self.generate_value(ret.value)))
-
-                return ASMReturn()
-            case _:
-                instruction.get_diagnoster().error_panic(
-                    ErrorKind.Unspported, "instruction conversion from ir to asm"
+    def generate_function(self, block: LinearBlock):
+        self.backend.add_label_start(block)
+
+        self.generate_virtual_instructions(block)
+        self.generate_block(block)
+
+        self.backend.add_label_end(block)
+
+    def generate_cached_function(self, block: LinearBlock):
+        key = self.get_function_key(block)
+        entry = self.cache.get(key)
+        peephole = self.backend.peephole
+
+        if entry == None:
+            output = self.backend.code.output
+            hits = {} if peephole == None else dict(peephole.hits)
+            self.backend.code.output = io.StringIO()
+
+            self.generate_function(block)
+
+            entry = (
+                self.backend.code.output.getvalue(),
+                {}
+                if peephole == None
+                else {
+                    rule: count - hits[rule] for rule, count in peephole.hits.items()
+                },
+            )
+            self.backend.code.output = output
+            self.cache.add(key, entry)
+        elif peephole != None:
+            for rule, count in entry[1].items():
+                peephole.hits[rule] += count
+
+        self.backend.code.write(entry[0])
+
+    def get_function_key(self, block: LinearBlock) -> tuple:
+        """
+        Everything the assembly of a block depends on. Calls refer to blocks by
+        index, so the name of the called block is used in their place, and
+        values go in by repr so that 0.0 and -0.0 are told apart.
+        """
+
+        return (
+            block.name,
+            tuple(block.register_types),
+            tuple(
+                (
+                    instruction.opcode,
+                    instruction.out,
+                    instruction.operands,
+                    self.code.blocks[instruction.value].name
+                    if instruction.opcode == LinearOpcode.Call
+                    else repr(instruction.value),
                 )
+                for instruction in block.instructions
+            ),
+        )
+
+    def generate_parallel(self):
+        """
+        Generates ranges of functions in a process pool, every function only
+        depends on the names of the others. The outputs are written in block
+        order, so the assembly is the same as with a single job.
+        """
+
+        ranges = split_blocks(self.code.blocks, self.jobs * RANGES_PER_JOB)
+        peephole = self.backend.peephole
+
+        with ProcessPoolExecutor(
+            self.jobs,
+            initializer=initialize_worker,
+            initargs=(type(self.backend), peephole != None, self.code),
+        ) as pool:
+            for output, hits in pool.map(generate_range, *zip(*ranges)):
+                self.backend.code.write(output)
+
+                if peephole != None:
+                    for rule, count in hits.items():
+                        peephole.hits[rule] += count
+
+    def generate_block(self, block: LinearBlock):
+        allocation = LinearScanAllocator(
+            RegisterPool(
+                self.backend.caller_saved_registers(False),
+                self.backend.callee_saved_registers(False),
+            ),
+            RegisterPool(
+                self.backend.caller_saved_registers(True),
+                self.backend.callee_saved_registers(True),
+            ),
+        ).allocate(self.instructions)
+
+        saved_slots = len(allocation.callee_saved)
+        locals_size = 8 * (saved_slots + len(allocation.slots))
+        locals_size += locals_size % 16
+
+        has_frame = allocation.has_calls or locals_size != 0
 
-    def generate_value(self, value: IRValue) -> str:
-        match value:
-            case integer if isinstance(integer, IRInteger):
-                return self.backend.repr_integer(integer.value)
-            case floatv if isinstance(floatv, IRFloat):
-                return self.backend.repr_float(floatv.value)
-            case stringref if isinstance(stringref, IRStringReference):
-                self.backend.add_instruction(ASMLoadAddress(0, f"str{stringref.index}"))
-                return self.backend.repr_register(0, False)
-            case binop if isinstance(binop, IRBinaryOperation):
-                isfloat = binop.get_type() == Type.Float
-
-                lhs_value = self.generate_value(binop.lhs)
-                rhs_value = self.generate_value(binop.rhs)
-
-                out_reg = self.backend.repr_register(10, isfloat)
-
-                self.backend.add_instruction(ASMMove(8, lhs_value))
-                lhs_reg = self.backend.repr_register(8, isfloat)
-
-                self.backend.add_instruction(ASMMove(9, rhs_value))
-                rhs_reg = self.backend.repr_register(9, isfloat)
-
-                match binop:
-                    case binadd if isinstance(binadd, IRAdd):
-                        BinOpInstruction = ASMAdd
-                    case binsub if isinstance(binsub, IRSub):
-                        BinOpInstruction = ASMSub
-                    case binmul if isinstance(binmul, IRMul):
-                        BinOpInstruction = ASMMul
-                    case bindiv if isinstance(bindiv, IRDiv):
-                        BinOpInstruction = ASMDiv
-                    case _:
-                        binop.get_diagnoster().error_panic(
+        if has_frame:
+            self.backend.add_frame_setup(locals_size)
+
+        for i, (register, isfloat) in enumerate(allocation.callee_saved):
+            self.backend.add_instruction(
+                ASMStore(
+                    self.backend.repr_register(register, isfloat),
+                    self.backend.repr_stack_slot(8 * i),
+                )
+            )
+
+        emitter = VirtualInstructionEmitter(
+            self.backend, allocation, 8 * saved_slots, has_frame, locals_size
+        )
+
+        for instruction in self.instructions:
+            emitter.emit(instruction)
+
+        if len(self.instructions) == 0 or not isinstance(
+            self.instructions[-1], VirtualReturn
+        ):
+            emitter.emit(VirtualReturn(None))
+
+    def generate_virtual_instructions(self, block: LinearBlock):
+        """
+        Maps every linear instruction to a virtual one in a single sweep, the
+        numbered registers of the block become virtual registers.
+        """
+
+        registers = [
+            VirtualRegister(register_type == Type.Float)
+            for register_type in block.register_types
+        ]
+        argument_registers = {
+            isfloat: self.backend.argument_registers(isfloat)
+            for isfloat in (False, True)
+        }
+        self.instructions = []
+
+        for instruction in block.instructions:
+            out = None if instruction.out == None else registers[instruction.out]
+            operands = [registers[operand] for operand in instruction.operands]
+
+            match instruction.opcode:
+                case LinearOpcode.Parameter:
+                    if len(argument_registers[out.isfloat]) == 0:
+                        self.code.diagnoster.error_panic(
                             ErrorKind.Unspported,
-                            "binary operation conversion from ir to asm",
+                            f"function: {block.name} has too many {'float' if out.isfloat else 'integer'} parameters",
                         )
 
-                self.backend.add_instruction(
-                    BinOpInstruction(
-                        isfloat,
-                        out_reg,
-                        lhs_reg,
-                        rhs_reg,
+                    out.hint = argument_registers[out.isfloat].pop(0)
+                    self.instructions.append(VirtualLoadParameter(out, out.hint))
+                case LinearOpcode.Integer:
+                    self.instructions.append(
+                        VirtualLoadImmediate(
+                            out, self.backend.repr_integer(instruction.value)
+                        )
+                    )
+                case LinearOpcode.Float:
+                    self.instructions.append(
+                        VirtualLoadImmediate(
+                            out, self.backend.repr_float(instruction.value)
+                        )
+                    )
+                case LinearOpcode.String:
+                    self.instructions.append(
+                        VirtualLoadAddress(out, f"str{instruction.value}")
+                    )
+                case opcode if opcode in BINARY_INSTRUCTIONS:
+                    if len(operands) == 2:
+                        rhs = operands[1]
+                    else:
+                        rhs = self.backend.repr_integer(instruction.value)
+
+                    self.instructions.append(
+                        VirtualBinaryOperation(
+                            BINARY_INSTRUCTIONS[opcode], out, operands[0], rhs
+                        )
+                    )
+                case LinearOpcode.Call:
+                    self.generate_call(instruction, operands, out)
+                case LinearOpcode.Return:
+                    value = operands[0]
+
+                    # Parameters keep their own hint, they must stay put until read
+                    if value.hint == None:
+                        value.hint = self.backend.return_register(value.isfloat)
+
+                    self.instructions.append(VirtualReturn(value))
+                case _:
+                    instruction.diagnoster.error_panic(
+                        ErrorKind.Unspported, "instruction conversion from ir to asm"
+                    )
+
+    def generate_call(
+        self,
+        call: LinearInstruction,
+        arguments: list[VirtualRegister],
+        result: VirtualRegister | None,
+    ):
+        argument_registers = {
+            isfloat: self.backend.argument_registers(isfloat)
+            for isfloat in (False, True)
+        }
+        targets = []
+
+        for argument in arguments:
+            if len(argument_registers[argument.isfloat]) == 0:
+                call.diagnoster.error_panic(
+                    ErrorKind.Unspported,
+                    f"call: too many {'float' if argument.isfloat else 'integer'} arguments",
+                )
+
+            target = argument_registers[argument.isfloat].pop(0)
+            targets.append((target, argument))
+
+            if argument.hint == None:
+                argument.hint = target
+
+        if result != None:
+            result.hint = self.backend.return_register(result.isfloat)
+
+        self.instructions.append(
+            VirtualCall(self.code.blocks[call.value].name, targets, result)
+        )
+
+
+def split_blocks(blocks: list[LinearBlock], count: int) -> list[tuple[int, int]]:
+    """
+    Splits the blocks into at most count contiguous ranges of about the same
+    number of instructions.
+    """
+
+    total = sum(len(block.instructions) + 1 for block in blocks)
+    ranges = []
+    start = 0
+    size = 0
+
+    for i, block in enumerate(blocks):
+        size += len(block.instructions) + 1
+
+        if size * count >= total * (len(ranges) + 1):
+            ranges.append((start, i + 1))
+            start = i + 1
+
+    if start != len(blocks):
+        ranges.append((start, len(blocks)))
+
+    return ranges
+
+
+# The code generator of a pool worker, set up once so that only block ranges
+# and their assembly go between the processes
+worker_gen: ASMGen | None = None
+
+
+def initialize_worker(
+    backend_type: ClassType[ASMBackend], peephole: bool, code: LinearCode
+):
+    global worker_gen
+
+    backend = backend_type(ASMCode())
+
+    if peephole:
+        backend.enable_peephole()
+
+    worker_gen = ASMGen(backend, code)
+
+
+def generate_range(start: int, end: int) -> tuple[str, dict[str, int]]:
+    backend = worker_gen.backend
+    backend.code.output = io.StringIO()
+
+    if backend.peephole != None:
+        backend.peephole.hits = dict.fromkeys(backend.peephole.hits, 0)
+
+    for block in worker_gen.code.blocks[start:end]:
+        worker_gen.generate_function(block)
+
+    hits = {} if backend.peephole == None else backend.peephole.hits
+
+    return (backend.code.output.getvalue(), hits)
+
+
+@dataclass()
+class VirtualInstructionEmitter:
+    backend: ASMBackend
+    allocation: Allocation
+    slots_offset: int
+    has_frame: bool
+    locals_size: int
+
+    def emit(self, instruction: VirtualInstruction):
+        match instruction:
+            case load if isinstance(load, VirtualLoadImmediate):
+                out = self.get_output_register(load.out)
+                self.backend.add_instruction(ASMMove(out, load.value))
+                self.store_output(load.out)
+            case load if isinstance(load, VirtualLoadParameter):
+                source = self.backend.repr_register(load.register, load.out.isfloat)
+
+                if load.out in self.allocation.slots:
+                    self.backend.add_instruction(
+                        ASMStore(source, self.get_slot(load.out))
                     )
+                elif self.get_register(load.out) != source:
+                    self.backend.add_instruction(
+                        ASMMove(self.get_register(load.out), source)
+                    )
+            case load if isinstance(load, VirtualLoadAddress):
+                out = self.get_output_register(load.out)
+                self.backend.add_instruction(ASMLoadAddress(out, load.address))
+                self.store_output(load.out)
+            case binop if isinstance(binop, VirtualBinaryOperation):
+                lhs = self.get_input_register(binop.lhs, 0)
+                rhs = binop.rhs
+
+                if isinstance(rhs, VirtualRegister):
+                    rhs = self.get_input_register(rhs, 1)
+
+                out = self.get_output_register(binop.out)
+                self.backend.add_instruction(
+                    binop.instruction(binop.out.isfloat, out, lhs, rhs)
                 )
+                self.store_output(binop.out)
+            case call if isinstance(call, VirtualCall):
+                self.emit_argument_moves(call.arguments)
+                self.backend.add_instruction(ASMCall(call.label_name))
 
-                return out_reg
-            case call if isinstance(call, IRCall):
-                self.backend.add_instruction(self.generate_asm_instruction(call))
-                return self.backend.repr_register(0, call.get_type() == Type.Float)
-            case _:
-                value.get_diagnoster().error_panic(
-                    ErrorKind.Unspported, "value conversion from ir to asm"
+                if call.result != None:
+                    isfloat = call.result.isfloat
+                    result = self.backend.repr_register(
+                        self.backend.return_register(isfloat), isfloat
+                    )
+
+                    if call.result in self.allocation.slots:
+                        self.backend.add_instruction(
+                            ASMStore(result, self.get_slot(call.result))
+                        )
+                    elif self.get_register(call.result) != result:
+                        self.backend.add_instruction(
+                            ASMMove(self.get_register(call.result), result)
+                        )
+            case ret if isinstance(ret, VirtualReturn):
+                if ret.value != None:
+                    isfloat = ret.value.isfloat
+                    self.emit_argument_moves(
+                        [(self.backend.return_register(isfloat), ret.value)]
+                    )
+
+                for i, (register, isfloat) in enumerate(self.allocation.callee_saved):
+                    self.backend.add_instruction(
+                        ASMLoad(
+                            self.backend.repr_register(register, isfloat),
+                            self.backend.repr_stack_slot(8 * i),
+                        )
+                    )
+
+                if self.has_frame:
+                    self.backend.add_frame_teardown(self.locals_size)
+
+                self.backend.add_instruction(ASMReturn())
+
+    def emit_argument_moves(self, arguments: list[tuple[int, VirtualRegister]]):
+        """
+        Moves every argument into its register as if all moves happened at once,
+        breaking cycles through a scratch register.
+        """
+
+        moves = {}
+        loads = []
+
+        for target, argument in arguments:
+            destination = self.backend.repr_register(target, argument.isfloat)
+
+            if argument in self.allocation.slots:
+                loads.append(ASMLoad(destination, self.get_slot(argument)))
+            elif self.get_register(argument) != destination:
+                moves[destination] = (self.get_register(argument), argument.isfloat)
+
+        while len(moves) != 0:
+            sources = {source for source, _ in moves.values()}
+            ready = [destination for destination in moves if destination not in sources]
+
+            if len(ready) != 0:
+                for destination in ready:
+                    source, _ = moves.pop(destination)
+                    self.backend.add_instruction(ASMMove(destination, source))
+
+                continue
+
+            # Every remaining destination is still needed as a source, a cycle
+            destination, (source, isfloat) = next(iter(moves.items()))
+            scratch = self.backend.repr_register(
+                self.backend.scratch_registers(isfloat)[0], isfloat
+            )
+            self.backend.add_instruction(ASMMove(scratch, source))
+
+            moves = {
+                other_destination: (
+                    scratch if other_source == source else other_source,
+                    other_isfloat,
                 )
+                for other_destination, (other_source, other_isfloat) in moves.items()
+            }
+
+        for load in loads:
+            self.backend.add_instruction(load)
+
+    def get_register(self, register: VirtualRegister) -> str:
+        return self.backend.repr_register(
+            self.allocation.registers[register], register.isfloat
+        )
+
+    def get_slot(self, register: VirtualRegister) -> str:
+        return self.backend.repr_stack_slot(
+            self.slots_offset + 8 * self.allocation.slots[register]
+        )
+
+    def get_scratch(self, register: VirtualRegister, index: int) -> str:
+        return self.backend.repr_register(
+            self.backend.scratch_registers(register.isfloat)[index], register.isfloat
+        )
+
+    def get_input_register(self, register: VirtualRegister, index: int) -> str:
+        if register in self.allocation.slots:
+            scratch = self.get_scratch(register, index)
+            self.backend.add_instruction(ASMLoad(scratch, self.get_slot(register)))
+
+            return scratch
+
+        return self.get_register(register)
+
+    def get_output_register(self, register: VirtualRegister) -> str:
+        if register in self.allocation.slots:
+            return self.get_scratch(register, 0)
+
+        return self.get_register(register)
+
+    def store_output(self, register: VirtualRegister):
+        if register in self.allocation.slots:
+            self.backend.add_instruction(
+                ASMStore(self.get_scratch(register, 0), self.get_slot(register))
+            )
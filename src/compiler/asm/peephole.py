@@ -0,0 +1,175 @@
+from dataclasses import dataclass, field, replace
+from .code import *
+
+PEEPHOLE_RULES = ["self-move", "redundant-move", "tail-call"]
+
+
+@dataclass()
+class PeepholeOptimizer:
+    """
+    Rewrites the instructions of one function at a time before they are
+    stringified. Function bodies are straight-line code, so a register is dead
+    after an instruction if it is written again, clobbered by a call or left
+    behind by a return before anything reads it.
+    """
+
+    # Registers a call may read (arguments) and clobbers (caller saved)
+    call_reads: set[str]
+    call_writes: set[str]
+    # Registers that still matter to the caller once the function returns
+    return_reads: set[str]
+    instructions: list[ASMInstruction] = field(default_factory=list)
+    hits: dict[str, int] = field(
+        default_factory=lambda: {rule: 0 for rule in PEEPHOLE_RULES}
+    )
+
+    def add(self, instruction: ASMInstruction):
+        self.instructions.append(instruction)
+
+    def flush(self) -> list[ASMInstruction]:
+        instructions = self.instructions
+        self.instructions = []
+
+        while self.run(instructions):
+            pass
+
+        return instructions
+
+    def run(self, instructions: list[ASMInstruction]) -> bool:
+        changed = False
+        i = 0
+
+        while i < len(instructions):
+            if (
+                self.remove_self_move(instructions, i)
+                or self.remove_redundant_move(instructions, i)
+                or self.convert_tail_call(instructions, i)
+            ):
+                changed = True
+                # A rewrite can expose another one just before it
+                i = max(i - 1, 0)
+            else:
+                i += 1
+
+        return changed
+
+    def remove_self_move(self, instructions: list[ASMInstruction], i: int) -> bool:
+        instruction = instructions[i]
+
+        if (
+            isinstance(instruction, ASMMove)
+            and instruction.register == instruction.value
+        ):
+            del instructions[i]
+            self.hits["self-move"] += 1
+
+            return True
+
+        return False
+
+    def remove_redundant_move(self, instructions: list[ASMInstruction], i: int) -> bool:
+        if i + 1 >= len(instructions):
+            return False
+
+        first = instructions[i]
+        second = instructions[i + 1]
+
+        if not isinstance(second, ASMMove) or not is_register(second.value):
+            return False
+
+        # mov a, b followed by mov b, a or by the same move again
+        if isinstance(first, ASMMove) and (
+            (first.register, first.value)
+            in [
+                (second.value, second.register),
+                (second.register, second.value),
+            ]
+        ):
+            del instructions[i + 1]
+            self.hits["redundant-move"] += 1
+
+            return True
+
+        # An instruction computing a temporary that is only moved elsewhere can
+        # write its result to the final register directly
+        temporary = second.value
+
+        if (
+            first.writes() == [temporary]
+            and second.register[0] == temporary[0]
+            and not self.is_live(instructions, i + 2, temporary)
+        ):
+            retargeted = self.retarget(first, second.register)
+
+            if retargeted != None:
+                instructions[i : i + 2] = [retargeted]
+                self.hits["redundant-move"] += 1
+
+                return True
+
+        return False
+
+    def convert_tail_call(self, instructions: list[ASMInstruction], i: int) -> bool:
+        call = instructions[i]
+
+        if not isinstance(call, ASMCall):
+            return False
+
+        # The frame teardown between the call and the return can run before the
+        # call as long as it leaves the arguments and the stack contents alone
+        j = i + 1
+
+        while j < len(instructions) and not isinstance(instructions[j], ASMReturn):
+            instruction = instructions[j]
+
+            if (
+                not isinstance(instruction, (ASMLoad, ASMLoadPair, ASMMove))
+                or set(instruction.reads()) & self.call_writes
+                or set(instruction.writes()) & self.call_reads
+            ):
+                return False
+
+            j += 1
+
+        if j == len(instructions):
+            return False
+
+        instructions[i : j + 1] = instructions[i + 1 : j] + [ASMBranch(call.label_name)]
+        self.hits["tail-call"] += 1
+
+        return True
+
+    def retarget(
+        self, instruction: ASMInstruction, register: str
+    ) -> ASMInstruction | None:
+        match instruction:
+            case binop if isinstance(binop, ASMBinaryOeration):
+                return replace(binop, out_reg=register)
+            case move if isinstance(move, (ASMMove, ASMLoadAddress, ASMLoad)):
+                return replace(move, register=register)
+            case _:
+                return None
+
+    def is_live(
+        self, instructions: list[ASMInstruction], start: int, register: str
+    ) -> bool:
+        for instruction in instructions[start:]:
+            match instruction:
+                case call if isinstance(call, ASMCall):
+                    if register in self.call_reads:
+                        return True
+
+                    if register in self.call_writes:
+                        return False
+                case branch if isinstance(branch, ASMBranch):
+                    return register in self.call_reads or register in self.return_reads
+                case ret if isinstance(ret, ASMReturn):
+                    return register in self.return_reads
+                case _:
+                    if register in instruction.reads():
+                        return True
+
+                    if register in instruction.writes():
+                        return False
+
+        return register in self.return_reads
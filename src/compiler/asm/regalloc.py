@@ -0,0 +1,223 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Type as ClassType
+from .code import ASMBinaryOeration
+
+
+@dataclass(eq=False)
+class VirtualRegister:
+    isfloat: bool
+    hint: int | None = None
+
+
+class VirtualInstruction:
+    def uses(self) -> list[VirtualRegister]:
+        return []
+
+    def defines(self) -> VirtualRegister | None:
+        return None
+
+
+@dataclass()
+class VirtualLoadImmediate(VirtualInstruction):
+    out: VirtualRegister
+    value: str
+
+    def defines(self) -> VirtualRegister | None:
+        return self.out
+
+
+@dataclass()
+class VirtualLoadParameter(VirtualInstruction):
+    out: VirtualRegister
+    register: int
+
+    def defines(self) -> VirtualRegister | None:
+        return self.out
+
+
+@dataclass()
+class VirtualLoadAddress(VirtualInstruction):
+    out: VirtualRegister
+    address: str
+
+    def defines(self) -> VirtualRegister | None:
+        return self.out
+
+
+@dataclass()
+class VirtualBinaryOperation(VirtualInstruction):
+    instruction: ClassType[ASMBinaryOeration]
+    out: VirtualRegister
+    lhs: VirtualRegister
+    # An immediate operand is kept as its textual representation
+    rhs: VirtualRegister | str
+
+    def uses(self) -> list[VirtualRegister]:
+        if isinstance(self.rhs, VirtualRegister):
+            return [self.lhs, self.rhs]
+
+        return [self.lhs]
+
+    def defines(self) -> VirtualRegister | None:
+        return self.out
+
+
+@dataclass()
+class VirtualCall(VirtualInstruction):
+    label_name: str
+    arguments: list[tuple[int, VirtualRegister]]
+    result: VirtualRegister | None
+
+    def uses(self) -> list[VirtualRegister]:
+        return [argument for _, argument in self.arguments]
+
+    def defines(self) -> VirtualRegister | None:
+        return self.result
+
+
+@dataclass()
+class VirtualReturn(VirtualInstruction):
+    value: VirtualRegister | None
+
+    def uses(self) -> list[VirtualRegister]:
+        return [] if self.value == None else [self.value]
+
+
+@dataclass()
+class LiveInterval:
+    register: VirtualRegister
+    start: int
+    end: int
+    crosses_call: bool = False
+
+
+@dataclass()
+class Allocation:
+    registers: dict[VirtualRegister, int] = field(default_factory=dict)
+    slots: dict[VirtualRegister, int] = field(default_factory=dict)
+    callee_saved: list[tuple[int, bool]] = field(default_factory=list)
+    has_calls: bool = False
+
+
+@dataclass()
+class RegisterPool:
+    caller_saved: list[int]
+    callee_saved: list[int]
+    free: list[int] = field(init=False)
+
+    def __post_init__(self):
+        self.free = self.caller_saved + self.callee_saved
+
+    def take(self, candidates: list[int]) -> int | None:
+        for register in candidates:
+            if register in self.free:
+                self.free.remove(register)
+                return register
+
+        return None
+
+    def release(self, register: int):
+        self.free.append(register)
+        # Keep the preference order stable so allocation is deterministic
+        order = self.caller_saved + self.callee_saved
+        self.free.sort(key=order.index)
+
+
+@dataclass()
+class LinearScanAllocator:
+    """
+    Linear scan over the virtual instructions of a single function.
+
+    An instruction at index i reads its operands at position 2i and writes its
+    result at 2i + 1, so an operand and the result of the same instruction can
+    share a register. Intervals live across a call are restricted to the callee
+    saved registers, anything that does not fit is spilled to a stack slot.
+    """
+
+    integer_pool: RegisterPool
+    float_pool: RegisterPool
+
+    def allocate(self, instructions: list[VirtualInstruction]) -> Allocation:
+        allocation = Allocation()
+        intervals: dict[VirtualRegister, LiveInterval] = {}
+        calls = []
+
+        for i, instruction in enumerate(instructions):
+            for register in instruction.uses():
+                intervals[register].end = 2 * i
+
+            register = instruction.defines()
+
+            if register != None:
+                intervals[register] = LiveInterval(register, 2 * i + 1, 2 * i + 1)
+
+            if isinstance(instruction, VirtualCall):
+                calls.append(2 * i)
+
+        allocation.has_calls = len(calls) != 0
+
+        for interval in intervals.values():
+            # Calls strictly inside the interval clobber every caller saved register
+            interval.crosses_call = bisect_right(calls, interval.start) < bisect_right(
+                calls, interval.end - 1
+            )
+
+        active: list[LiveInterval] = []
+        used_callee_saved: set[tuple[int, bool]] = set()
+
+        # Intervals are created in definition order, so they are already sorted
+        for interval in intervals.values():
+            for expired in [other for other in active if other.end < interval.start]:
+                active.remove(expired)
+                self.pool(expired.register).release(
+                    allocation.registers[expired.register]
+                )
+
+            pool = self.pool(interval.register)
+            candidates = self.candidates(pool, interval)
+            register = pool.take(candidates)
+
+            if register == None:
+                victims = [
+                    other
+                    for other in active
+                    if other.register.isfloat == interval.register.isfloat
+                    and allocation.registers[other.register] in candidates
+                ]
+                victim = max(victims, key=lambda other: other.end, default=None)
+
+                if victim == None or victim.end <= interval.end:
+                    allocation.slots[interval.register] = len(allocation.slots)
+                    continue
+
+                register = allocation.registers.pop(victim.register)
+                allocation.slots[victim.register] = len(allocation.slots)
+                active.remove(victim)
+
+            allocation.registers[interval.register] = register
+            active.append(interval)
+
+            if register in pool.callee_saved:
+                used_callee_saved.add((register, interval.register.isfloat))
+
+        allocation.callee_saved = sorted(
+            used_callee_saved, key=lambda saved: (saved[1], saved[0])
+        )
+
+        return allocation
+
+    def pool(self, register: VirtualRegister) -> RegisterPool:
+        return self.float_pool if register.isfloat else self.integer_pool
+
+    def candidates(self, pool: RegisterPool, interval: LiveInterval) -> list[int]:
+        if interval.crosses_call:
+            return pool.callee_saved
+
+        hint = interval.register.hint
+        candidates = pool.caller_saved + pool.callee_saved
+
+        if hint != None and hint in candidates:
+            return [hint] + candidates
+
+        return candidates
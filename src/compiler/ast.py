@@ -16,19 +16,23 @@ class Type(enum.Enum):
 
 
 class Node(object):
-    ...
+    # There is a node for every token or so, none of them carries an attribute
+    # dictionary
+    __slots__ = ()
 
 
 class Statement(Node):
+    __slots__ = ()
+
     def get_diagnoster(self) -> Diagnoster:
         ...
 
 
 class Expression(Statement):
-    ...
+    __slots__ = ()
 
 
-@dataclass()
+@dataclass(slots=True)
 class Identifier(Expression):
     value: str
     diagnoster: Diagnoster
@@ -37,7 +41,7 @@ class Identifier(Expression):
         return self.diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class String(Expression):
     value: str
     diagnoster: Diagnoster
@@ -46,7 +50,7 @@ class String(Expression):
         return self.diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class Integer(Expression):
     value: int
     diagnoster: Diagnoster
@@ -55,7 +59,7 @@ class Integer(Expression):
         return self.diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class Float(Expression):
     value: float
     diagnoster: Diagnoster
@@ -64,7 +68,7 @@ class Float(Expression):
         return self.diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class BinaryOperation(Expression):
     lhs: Expression
     operator: Token
@@ -74,7 +78,7 @@ class BinaryOperation(Expression):
         return self.operator.diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class Call(Expression):
     callable: Expression
     arguments: list[Expression]
@@ -83,14 +87,14 @@ class Call(Expression):
         return self.callable.get_diagnoster()
 
 
-@dataclass()
+@dataclass(slots=True)
 class FunctionParameter:
     name: Identifier
     expected_type: Type
     diagnoster: Diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class FunctionDefinition(Statement):
     name: Identifier
     parameters: list[FunctionParameter]
@@ -101,7 +105,7 @@ class FunctionDefinition(Statement):
         return self.name.get_diagnoster()
 
 
-@dataclass()
+@dataclass(slots=True)
 class ReturnStatement(Statement):
     value: Expression
 
@@ -109,7 +113,7 @@ class ReturnStatement(Statement):
         return self.value.get_diagnoster()
 
 
-@dataclass()
+@dataclass(slots=True)
 class Program(Node):
     body: list[Statement]
     diagnoster: Diagnoster
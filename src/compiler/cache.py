@@ -0,0 +1,197 @@
+import hashlib
+import marshal
+import os
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Protocol
+from .errors import Diagnoster
+from .lexer import Lexer, Token, TokenKind
+from .source import FileTable
+
+CACHE_VERSION = 2
+
+# A full cache evicts down to this share of its maximum size, so the next few
+# misses do not have to list the directory again
+EVICTION_TARGET_PERCENT = 75
+
+TOKEN_KINDS = {kind.value: kind for kind in TokenKind}
+
+
+def default_cache_directory() -> Path:
+    return Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser() / "pasm"
+
+
+class TokenSource(Protocol):
+    """
+    Where the preprocessor takes the tokens of an included file from, instead
+    of lexing it again
+    """
+
+    def load(self, file_path: Path, files: FileTable) -> list[Token]:
+        ...
+
+
+@dataclass()
+class TokenCache:
+    directory: Path
+    max_size: int = 64 << 20
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # Entries already read or written by this process, so a file included by
+    # every input of a batch is read from disk once
+    entries: dict[Path, tuple] = field(default_factory=dict, repr=False)
+    # Total size of the entries on disk, listed once per process and then kept
+    # up to date by writes and evictions
+    size: int | None = None
+
+    def load(self, file_path: Path, files: FileTable) -> list[Token]:
+        resolved_path = file_path.resolve()
+        entry_path = self.directory / (
+            hashlib.sha256(str(resolved_path).encode()).hexdigest()[:32] + ".tokens"
+        )
+
+        stat = resolved_path.stat()
+        entry = self.entries.get(entry_path)
+
+        if entry == None:
+            entry = self.read_entry(entry_path)
+
+            if entry != None:
+                self.touch_entry(entry_path)
+
+        if entry != None and entry[1:3] == (stat.st_mtime_ns, stat.st_size):
+            self.hits += 1
+            self.entries[entry_path] = entry
+
+            return self.decode(entry, files, files.add(file_path))
+
+        with open(resolved_path, "rb") as f:
+            source = f.read()
+
+        digest = hashlib.sha256(source).digest()
+
+        if entry != None and entry[3] == digest:
+            # Touched but unchanged, only refresh the stat part of the key
+            self.hits += 1
+            self.entries[entry_path] = (
+                CACHE_VERSION,
+                stat.st_mtime_ns,
+                stat.st_size,
+            ) + entry[3:]
+            self.write_entry(entry_path, self.entries[entry_path])
+
+            return self.decode(entry, files, files.add(file_path, source))
+
+        self.misses += 1
+
+        tokens = Lexer(
+            source, Diagnoster(files, files.add(file_path, source))
+        ).tokenize()
+
+        self.entries[entry_path] = self.encode(
+            tokens, stat.st_mtime_ns, stat.st_size, digest
+        )
+        self.write_entry(entry_path, self.entries[entry_path])
+        self.evict()
+
+        return tokens
+
+    def encode(self, tokens: list[Token], mtime: int, size: int, digest: bytes):
+        return (
+            CACHE_VERSION,
+            mtime,
+            size,
+            digest,
+            bytes(tok.kind.value for tok in tokens),
+            array("I", (tok.offset for tok in tokens)).tobytes(),
+            [tok.value for tok in tokens],
+        )
+
+    def decode(self, entry: tuple, files: FileTable, file_id: int) -> list[Token]:
+        _, _, _, _, kinds, offsets, values = entry
+
+        return [
+            Token(TOKEN_KINDS[kind], files, file_id, offset, value)
+            for kind, offset, value in zip(kinds, array("I", offsets), values)
+        ]
+
+    def read_entry(self, entry_path: Path) -> tuple | None:
+        try:
+            with open(entry_path, "rb") as f:
+                entry = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        if not isinstance(entry, tuple) or len(entry) != 7:
+            return None
+
+        if entry[0] != CACHE_VERSION:
+            return None
+
+        return entry
+
+    def write_entry(self, entry_path: Path, entry: tuple):
+        temporary_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+
+        # The cache is only an accelerator, an unwritable directory just means
+        # every include is lexed again
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+            with open(temporary_path, "wb") as f:
+                marshal.dump(entry, f)
+                written = f.tell()
+
+            replaced = self.get_entry_size(entry_path)
+            os.replace(temporary_path, entry_path)
+        except OSError:
+            temporary_path.unlink(missing_ok=True)
+            return
+
+        if self.size != None:
+            self.size += written - replaced
+
+    def get_entry_size(self, entry_path: Path) -> int:
+        try:
+            return entry_path.stat().st_size
+        except OSError:
+            return 0
+
+    def touch_entry(self, entry_path: Path):
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+    def evict(self):
+        if self.size != None and self.size <= self.max_size:
+            return
+
+        entries = []
+        total_size = 0
+
+        for entry_path in self.directory.glob("*.tokens"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+
+            entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+            total_size += stat.st_size
+
+        if total_size > self.max_size:
+            # Hits refresh the entry mtime, so the oldest mtime is the least
+            # recently used
+            entries.sort()
+
+            for _, size, entry_path in entries:
+                if total_size <= self.max_size * EVICTION_TARGET_PERCENT // 100:
+                    break
+
+                entry_path.unlink(missing_ok=True)
+                total_size -= size
+                self.evictions += 1
+
+        self.size = total_size
@@ -4,6 +4,7 @@ from sys import stderr
 from pathlib import Path
 from typing import Never
 from .position import Position
+from .source import FileTable
 
 
 class ErrorKind(enum.Enum):
@@ -13,7 +14,7 @@ class ErrorKind(enum.Enum):
     Types = enum.auto()
 
 
-@dataclass()
+@dataclass(slots=True)
 class Error:
     kind: ErrorKind
     context: str
@@ -26,10 +27,19 @@ class Error:
         exit(self.kind.value)
 
 
-@dataclass()
+@dataclass(slots=True)
 class Diagnoster:
-    file_path: Path
-    position: Position = field(default_factory=Position)
+    files: FileTable = field(repr=False)
+    file_id: int
+    offset: int = 0
+
+    @property
+    def file_path(self) -> Path:
+        return self.files.get_path(self.file_id)
+
+    @property
+    def position(self) -> Position:
+        return self.files.get_position(self.file_id, self.offset)
 
     def error_panic(self, kind: ErrorKind, context: str) -> Never:
         Error(kind, context).panic(self.file_path, self.position)
@@ -4,6 +4,8 @@ from ..errors import Diagnoster
 
 
 class IRValue:
+    __slots__ = ()
+
     def get_type(self) -> Type:
         return Type.Void
 
@@ -11,7 +13,7 @@ class IRValue:
         ...
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRInteger(IRValue):
     value: int
     diagnoster: Diagnoster
@@ -23,7 +25,7 @@ class IRInteger(IRValue):
         return self.diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRFloat(IRValue):
     value: float
     diagnoster: Diagnoster
@@ -36,53 +38,60 @@ class IRFloat(IRValue):
 
 
 class IRBinaryOperation(IRValue):
+    # The operands are slots of the subclasses
+    __slots__ = ("type",)
+
     lhs: IRValue
     rhs: IRValue
     diagnoster: Diagnoster
+    type: Type
 
-    def get_type(self) -> Type:
-        assert self.lhs.get_type() == self.rhs.get_type()
+    def __post_init__(self):
+        # Computed once, both hand sides having the same type is checked by
+        # IRGen and by the IR verifier
+        self.type = self.lhs.get_type()
 
-        return self.lhs.get_type()
+    def get_type(self) -> Type:
+        return self.type
 
     def get_diagnoster(self) -> Diagnoster:
         return self.diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRAdd(IRBinaryOperation):
     lhs: IRValue
     rhs: IRValue
     diagnoster: Diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRSub(IRBinaryOperation):
     lhs: IRValue
     rhs: IRValue
     diagnoster: Diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRMul(IRBinaryOperation):
     lhs: IRValue
     rhs: IRValue
     diagnoster: Diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRDiv(IRBinaryOperation):
     lhs: IRValue
     rhs: IRValue
     diagnoster: Diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRStringLiteral:
     value: str
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRStringReference(IRValue):
     index: int
     diagnoster: Diagnoster
@@ -94,18 +103,33 @@ class IRStringReference(IRValue):
         return self.diagnoster
 
 
+@dataclass(slots=True)
+class IRParameter(IRValue):
+    index: int
+    type: Type
+    diagnoster: Diagnoster
+
+    def get_type(self) -> Type:
+        return self.type
+
+    def get_diagnoster(self) -> Diagnoster:
+        return self.diagnoster
+
+
 class IRInstruction:
+    __slots__ = ()
+
     def get_diagnoster(self) -> Diagnoster:
         ...
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRBlockSignature:
     parameters_types: list[Type]
     return_type: Type
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRBlock:
     name: str
     signature: IRBlockSignature
@@ -113,7 +137,7 @@ class IRBlock:
     returned: bool = False
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRBlockReference(IRValue):
     index: int
     signature: IRBlockSignature
@@ -126,7 +150,7 @@ class IRBlockReference(IRValue):
         return self.diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRCall(IRValue, IRInstruction):
     callable: IRBlockReference
     arguments: list[IRValue]
@@ -138,7 +162,7 @@ class IRCall(IRValue, IRInstruction):
         return self.callable.get_diagnoster()
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRReturn(IRInstruction):
     value: IRValue
     diagnoster: Diagnoster
@@ -147,19 +171,42 @@ class IRReturn(IRInstruction):
         return self.diagnoster
 
 
-@dataclass()
+@dataclass(slots=True)
 class IRCode:
     diagnoster: Diagnoster
     blocks: list[IRBlock] = field(default_factory=list)
     string_literals: list[IRStringLiteral] = field(default_factory=list)
+    block_indices: dict[str, int] = field(default_factory=dict)
+    string_literal_indices: dict[str, int] = field(default_factory=dict)
+    string_bytes_saved: int = 0
+
+    def add_block(self, block: IRBlock) -> int:
+        self.block_indices[block.name] = len(self.blocks)
+        self.blocks.append(block)
+
+        return len(self.blocks) - 1
 
     def get_block(self, name: str) -> int | None:
-        try:
-            return [block.name for block in self.blocks].index(name)
-        except ValueError:
+        return self.block_indices.get(name)
+
+    def get_signature(self, name: str) -> IRBlockSignature | None:
+        index = self.block_indices.get(name)
+
+        if index == None:
             return None
 
+        return self.blocks[index].signature
+
     def add_string_literal(self, literal: IRStringLiteral) -> int:
+        index = self.string_literal_indices.get(literal.value)
+
+        if index != None:
+            # Account for the terminating NUL byte emitted with every literal
+            self.string_bytes_saved += len(literal.value.encode()) + 1
+
+            return index
+
+        self.string_literal_indices[literal.value] = len(self.string_literals)
         self.string_literals.append(literal)
 
         return len(self.string_literals) - 1
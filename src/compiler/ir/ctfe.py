@@ -0,0 +1,254 @@
+from dataclasses import dataclass, field
+from .code import *
+from .fold import apply_float_operation, apply_integer_operation
+
+# Nodes the interpreter may evaluate for a single call site
+CTFE_STEP_LIMIT = 100_000
+
+# Nested calls the interpreter may follow before giving up
+CTFE_DEPTH_LIMIT = 64
+
+
+class EvaluationAborted(Exception):
+    ...
+
+
+@dataclass()
+class CompileTimeEvaluator:
+    """
+    Runs calls whose arguments are all constants through an IR interpreter and
+    replaces them with their result. Functions cannot have side effects, so any
+    call that finishes within the limits can be evaluated; the rest are left
+    for runtime.
+    """
+
+    code: IRCode
+    step_limit: int = CTFE_STEP_LIMIT
+    depth_limit: int = CTFE_DEPTH_LIMIT
+    evaluated: int = 0
+    steps: int = 0
+    results: dict[tuple, int | float | IRStringReference | None] = field(
+        default_factory=dict
+    )
+
+    def run(self):
+        for block in self.code.blocks:
+            instructions = []
+
+            for instruction in block.instructions:
+                match instruction:
+                    case ret if isinstance(ret, IRReturn):
+                        ret.value = self.evaluate_constant_calls(ret.value)
+                        instructions.append(ret)
+                    case call if isinstance(call, IRCall):
+                        call.arguments = [
+                            self.evaluate_constant_calls(argument)
+                            for argument in call.arguments
+                        ]
+
+                        # A discarded result that could be computed means the
+                        # call is not needed at all
+                        finished, _ = self.try_call(call)
+
+                        if finished:
+                            self.evaluated += 1
+                        else:
+                            instructions.append(call)
+                    case _:
+                        instructions.append(instruction)
+
+            block.instructions = instructions
+
+    def evaluate_constant_calls(self, value: IRValue) -> IRValue:
+        """
+        Evaluates the calls of a value in post order over an explicit stack,
+        the arguments of a call are evaluated before the call itself.
+        """
+
+        values: list[IRValue] = []
+        stack: list[tuple[IRValue, bool]] = [(value, False)]
+
+        while len(stack) != 0:
+            value, evaluated_children = stack.pop()
+
+            match value:
+                case binop if isinstance(binop, IRBinaryOperation):
+                    if not evaluated_children:
+                        stack.append((binop, True))
+                        stack.append((binop.rhs, False))
+                        stack.append((binop.lhs, False))
+                        continue
+
+                    binop.rhs = values.pop()
+                    binop.lhs = values.pop()
+                    values.append(binop)
+                case call if isinstance(call, IRCall):
+                    if not evaluated_children:
+                        stack.append((call, True))
+                        stack.extend(
+                            (argument, False) for argument in reversed(call.arguments)
+                        )
+                        continue
+
+                    call.arguments = values[len(values) - len(call.arguments) :]
+                    del values[len(values) - len(call.arguments) :]
+                    values.append(self.evaluate_constant_call(call))
+                case _:
+                    values.append(value)
+
+        return values.pop()
+
+    def evaluate_constant_call(self, call: IRCall) -> IRValue:
+        _, result = self.try_call(call)
+
+        match result:
+            case integer if isinstance(integer, int):
+                self.evaluated += 1
+                return IRInteger(integer, call.get_diagnoster())
+            case floatv if isinstance(floatv, float):
+                self.evaluated += 1
+                return IRFloat(floatv, call.get_diagnoster())
+            case stringref if isinstance(stringref, IRStringReference):
+                self.evaluated += 1
+                return IRStringReference(stringref.index, call.get_diagnoster())
+            case _:
+                return call
+
+    def try_call(
+        self, call: IRCall
+    ) -> tuple[bool, int | float | IRStringReference | None]:
+        """
+        Whether a call with constant arguments finished within the limits, and
+        its result, None for void functions.
+        """
+
+        arguments = []
+
+        for argument in call.arguments:
+            match argument:
+                case integer if isinstance(integer, IRInteger):
+                    arguments.append(integer.value)
+                case floatv if isinstance(floatv, IRFloat):
+                    arguments.append(floatv.value)
+                case stringref if isinstance(stringref, IRStringReference):
+                    arguments.append(stringref)
+                case _:
+                    return (False, None)
+
+        signature = call.callable.signature
+
+        # Mismatched calls are left for the code generator to report
+        if len(arguments) != len(signature.parameters_types) or any(
+            argument.get_type() != parameter_type
+            for argument, parameter_type in zip(
+                call.arguments, signature.parameters_types
+            )
+        ):
+            return (False, None)
+
+        self.steps = 0
+
+        try:
+            return (True, self.call_block(call.callable.index, arguments, 0))
+        except EvaluationAborted:
+            return (False, None)
+
+    def call_block(self, index: int, arguments: list, depth: int):
+        key = (index,) + tuple(self.get_key(argument) for argument in arguments)
+
+        if key in self.results:
+            return self.results[key]
+
+        if depth >= self.depth_limit:
+            raise EvaluationAborted()
+
+        result = None
+
+        for instruction in self.code.blocks[index].instructions:
+            match instruction:
+                case ret if isinstance(ret, IRReturn):
+                    result = self.evaluate(ret.value, arguments, depth)
+                    break
+                case call if isinstance(call, IRCall):
+                    self.evaluate(call, arguments, depth)
+                case _:
+                    raise EvaluationAborted()
+
+        self.results[key] = result
+
+        return result
+
+    def get_key(self, argument: int | float | IRStringReference) -> tuple:
+        # 1 and 1.0 (and 0.0 and -0.0) compare equal but are different arguments
+        match argument:
+            case floatv if isinstance(floatv, float):
+                return ("float", floatv.hex())
+            case stringref if isinstance(stringref, IRStringReference):
+                return ("string", stringref.index)
+            case _:
+                return ("int", argument)
+
+    def evaluate(self, value: IRValue, arguments: list, depth: int):
+        """
+        Evaluates a value in post order over an explicit stack, every node
+        counts as one step when it is first visited. Only calls to other
+        blocks recurse, and those are bounded by the depth limit.
+        """
+
+        values: list = []
+        stack: list[tuple[IRValue, bool]] = [(value, False)]
+
+        while len(stack) != 0:
+            value, evaluated_children = stack.pop()
+
+            if not evaluated_children:
+                self.steps += 1
+
+                if self.steps > self.step_limit:
+                    raise EvaluationAborted()
+
+            match value:
+                case integer if isinstance(integer, IRInteger):
+                    values.append(integer.value)
+                case floatv if isinstance(floatv, IRFloat):
+                    values.append(floatv.value)
+                case stringref if isinstance(stringref, IRStringReference):
+                    values.append(stringref)
+                case parameter if isinstance(parameter, IRParameter):
+                    values.append(arguments[parameter.index])
+                case binop if isinstance(binop, IRBinaryOperation):
+                    if not evaluated_children:
+                        stack.append((binop, True))
+                        stack.append((binop.rhs, False))
+                        stack.append((binop.lhs, False))
+                        continue
+
+                    rhs = values.pop()
+                    lhs = values.pop()
+
+                    # Division by zero is left to the target to define
+                    if isinstance(binop, IRDiv) and rhs == 0:
+                        raise EvaluationAborted()
+
+                    if isinstance(lhs, int):
+                        values.append(apply_integer_operation(binop, lhs, rhs))
+                    else:
+                        values.append(apply_float_operation(binop, lhs, rhs))
+                case call if isinstance(call, IRCall):
+                    if not evaluated_children:
+                        stack.append((call, True))
+                        stack.extend(
+                            (argument, False) for argument in reversed(call.arguments)
+                        )
+                        continue
+
+                    call_arguments = values[len(values) - len(call.arguments) :]
+                    del values[len(values) - len(call.arguments) :]
+
+                    values.append(
+                        self.call_block(call.callable.index, call_arguments, depth + 1)
+                    )
+                case _:
+                    raise EvaluationAborted()
+
+        return values.pop()
@@ -0,0 +1,105 @@
+from dataclasses import dataclass, field
+from typing import Iterator
+from .code import *
+
+
+@dataclass()
+class DeadFunctionEliminator:
+    code: IRCode
+    exported: list[str] = field(default_factory=list)
+    removed: int = 0
+    removed_string_literals: int = 0
+
+    def run(self):
+        # Without main the code generator reports the missing entry point
+        if self.code.get_block("main") == None:
+            return
+
+        roots = [
+            self.code.get_block(name)
+            for name in ["main"] + self.exported
+            if self.code.get_block(name) != None
+        ]
+
+        reachable = set(roots)
+        string_references = set()
+        pending = list(roots)
+
+        while len(pending) != 0:
+            block = self.code.blocks[pending.pop()]
+
+            for value in self.walk(block):
+                match value:
+                    case br if isinstance(br, IRBlockReference):
+                        if br.index not in reachable:
+                            reachable.add(br.index)
+                            pending.append(br.index)
+                    case stringref if isinstance(stringref, IRStringReference):
+                        string_references.add(stringref.index)
+                    case _:
+                        ...
+
+        if len(reachable) == len(self.code.blocks):
+            return
+
+        self.compact(reachable, string_references)
+
+    def walk(self, block: IRBlock) -> Iterator[IRValue]:
+        stack: list = list(reversed(block.instructions))
+
+        while len(stack) != 0:
+            value = stack.pop()
+
+            match value:
+                case ret if isinstance(ret, IRReturn):
+                    stack.append(ret.value)
+                case binop if isinstance(binop, IRBinaryOperation):
+                    stack.append(binop.rhs)
+                    stack.append(binop.lhs)
+                case call if isinstance(call, IRCall):
+                    stack.extend(reversed(call.arguments))
+                    yield call.callable
+                case _:
+                    yield value
+
+    def compact(self, reachable: set[int], string_references: set[int]):
+        block_indices = {}
+        string_literal_indices = {}
+
+        blocks = [block for i, block in enumerate(self.code.blocks) if i in reachable]
+        string_literals = [
+            literal
+            for i, literal in enumerate(self.code.string_literals)
+            if i in string_references
+        ]
+
+        for i in sorted(reachable):
+            block_indices[i] = len(block_indices)
+
+        for i in sorted(string_references):
+            string_literal_indices[i] = len(string_literal_indices)
+
+        for block in blocks:
+            for value in self.walk(block):
+                match value:
+                    case br if isinstance(br, IRBlockReference):
+                        br.index = block_indices[br.index]
+                    case stringref if isinstance(stringref, IRStringReference):
+                        stringref.index = string_literal_indices[stringref.index]
+                    case _:
+                        ...
+
+        self.removed += len(self.code.blocks) - len(blocks)
+        self.removed_string_literals += len(self.code.string_literals) - len(
+            string_literals
+        )
+
+        self.code.blocks = []
+        self.code.block_indices = {}
+        self.code.string_literals = string_literals
+        self.code.string_literal_indices = {
+            literal.value: i for i, literal in enumerate(string_literals)
+        }
+
+        for block in blocks:
+            self.code.add_block(block)
@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from ..errors import ErrorKind
+from .code import *
+
+INTEGER_BITS = 64
+
+
+def wrap_integer(value: int) -> int:
+    value &= (1 << INTEGER_BITS) - 1
+
+    if value >= 1 << (INTEGER_BITS - 1):
+        value -= 1 << INTEGER_BITS
+
+    return value
+
+
+def divide_integers(lhs: int, rhs: int) -> int:
+    # Matches sdiv, the quotient is truncated toward zero
+    quotient = abs(lhs) // abs(rhs)
+
+    if (lhs < 0) != (rhs < 0):
+        quotient = -quotient
+
+    return wrap_integer(quotient)
+
+
+def apply_integer_operation(binop: IRBinaryOperation, lhs: int, rhs: int) -> int:
+    match binop:
+        case add if isinstance(add, IRAdd):
+            return wrap_integer(lhs + rhs)
+        case sub if isinstance(sub, IRSub):
+            return wrap_integer(lhs - rhs)
+        case mul if isinstance(mul, IRMul):
+            return wrap_integer(lhs * rhs)
+        case div if isinstance(div, IRDiv):
+            return divide_integers(lhs, rhs)
+        case _:
+            binop.get_diagnoster().error_panic(
+                ErrorKind.Unspported, "binary operation constant folding"
+            )
+
+
+def apply_float_operation(binop: IRBinaryOperation, lhs: float, rhs: float) -> float:
+    match binop:
+        case add if isinstance(add, IRAdd):
+            return lhs + rhs
+        case sub if isinstance(sub, IRSub):
+            return lhs - rhs
+        case mul if isinstance(mul, IRMul):
+            return lhs * rhs
+        case div if isinstance(div, IRDiv):
+            return lhs / rhs
+        case _:
+            binop.get_diagnoster().error_panic(
+                ErrorKind.Unspported, "binary operation constant folding"
+            )
+
+
+@dataclass()
+class ConstantFolder:
+    code: IRCode
+    folded: int = 0
+
+    def run(self):
+        for block in self.code.blocks:
+            for instruction in block.instructions:
+                self.fold_instruction(instruction)
+
+    def fold_instruction(self, instruction: IRInstruction):
+        match instruction:
+            case ret if isinstance(ret, IRReturn):
+                ret.value = self.fold(ret.value)
+            case call if isinstance(call, IRCall):
+                self.fold(call)
+            case _:
+                ...
+
+    def fold(self, value: IRValue) -> IRValue:
+        """
+        Folds a value in post order over an explicit stack, folded children are
+        left on the values stack for their parent to pick up.
+        """
+
+        values: list[IRValue] = []
+        stack: list[tuple[IRValue, bool]] = [(value, False)]
+
+        while len(stack) != 0:
+            value, folded_children = stack.pop()
+
+            match value:
+                case binop if isinstance(binop, IRBinaryOperation):
+                    if not folded_children:
+                        stack.append((binop, True))
+                        stack.append((binop.rhs, False))
+                        stack.append((binop.lhs, False))
+                        continue
+
+                    binop.rhs = values.pop()
+                    binop.lhs = values.pop()
+                    values.append(self.fold_binary_operation(binop))
+                case call if isinstance(call, IRCall):
+                    if not folded_children:
+                        stack.append((call, True))
+                        stack.extend(
+                            (argument, False) for argument in reversed(call.arguments)
+                        )
+                        continue
+
+                    call.arguments = values[len(values) - len(call.arguments) :]
+                    del values[len(values) - len(call.arguments) :]
+                    values.append(call)
+                case _:
+                    values.append(value)
+
+        return values.pop()
+
+    def fold_binary_operation(self, binop: IRBinaryOperation) -> IRValue:
+        if isinstance(binop.lhs, IRInteger) and isinstance(binop.rhs, IRInteger):
+            self.folded += 1
+            return IRInteger(self.fold_integers(binop), binop.get_diagnoster())
+
+        if isinstance(binop.lhs, IRFloat) and isinstance(binop.rhs, IRFloat):
+            self.folded += 1
+            return IRFloat(self.fold_floats(binop), binop.get_diagnoster())
+
+        return binop
+
+    def fold_integers(self, binop: IRBinaryOperation) -> int:
+        if isinstance(binop, IRDiv) and binop.rhs.value == 0:
+            binop.get_diagnoster().error_panic(
+                ErrorKind.Invalid, "binary operation: division by zero"
+            )
+
+        return apply_integer_operation(binop, binop.lhs.value, binop.rhs.value)
+
+    def fold_floats(self, binop: IRBinaryOperation) -> float:
+        if isinstance(binop, IRDiv) and binop.rhs.value == 0:
+            binop.get_diagnoster().error_panic(
+                ErrorKind.Invalid, "binary operation: division by zero"
+            )
+
+        return apply_float_operation(binop, binop.lhs.value, binop.rhs.value)
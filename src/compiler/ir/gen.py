@@ -11,11 +11,13 @@ class IRGen:
     program: Program
     code: IRCode
     current_block: IRBlock | None
+    current_parameters: dict[str, tuple[int, Type]]
 
     def __init__(self, program: Program) -> None:
         self.program = program
         self.code = IRCode(program.diagnoster)
         self.current_block = None
+        self.current_parameters = {}
 
     def generate(self):
         for stmt in self.program.body:
@@ -43,6 +45,11 @@ class IRGen:
                     ),
                 )
 
+                self.current_parameters = {
+                    parameter.name.value: (i, parameter.expected_type)
+                    for i, parameter in enumerate(funcdef.parameters)
+                }
+
                 for stmt in funcdef.body:
                     self.generate_stmt(stmt)
 
@@ -55,8 +62,9 @@ class IRGen:
                         f"function: expected to return an expression with a type of {str(self.current_block.signature.return_type)}",
                     )
 
-                self.code.blocks.append(self.current_block)
+                self.code.add_block(self.current_block)
                 self.current_block = None
+                self.current_parameters = {}
             case returnstmt if isinstance(returnstmt, ReturnStatement):
                 if self.current_block == None:
                     returnstmt.get_diagnoster().error_panic(
@@ -93,84 +101,131 @@ class IRGen:
                 ...
 
     def generate_expr(self, expr: Expression) -> IRValue:
+        """
+        Lowers an expression in post order over an explicit stack, so the depth
+        of the tree is only bounded by memory.
+        """
+
         if self.current_block == None:
             expr.get_diagnoster().error_panic(
                 ErrorKind.Invalid,
                 "expression: expected the expression to be inside a function",
             )
 
-        match expr:
-            case integerexpr if isinstance(integerexpr, Integer):
-                return IRInteger(integerexpr.value, integerexpr.diagnoster)
-            case floatexpr if isinstance(floatexpr, Float):
-                return IRFloat(floatexpr.value, floatexpr.diagnoster)
-            case stringexpr if isinstance(stringexpr, String):
-                index = self.code.add_string_literal(IRStringLiteral(stringexpr.value))
-                return IRStringReference(index, stringexpr.diagnoster)
-            case binaryop if isinstance(binaryop, BinaryOperation):
-                supported_types = [Type.Integer, Type.Float]
-
-                lhs = self.generate_expr(binaryop.lhs)
-                rhs = self.generate_expr(binaryop.rhs)
-
-                if lhs.get_type() not in supported_types:
-                    lhs.get_diagnoster().error_panic(
-                        ErrorKind.Invalid,
-                        f"binary operation: expected the left hand side to be of type {' or '.join([str(type) for type in supported_types])}",
-                    )
+        values: list[IRValue] = []
+        stack: list[tuple[Expression, bool]] = [(expr, False)]
 
-                if rhs.get_type() not in supported_types:
-                    rhs.get_diagnoster().error_panic(
-                        ErrorKind.Invalid,
-                        f"binary operation: expected the right hand side to be of type {' or '.join([str(type) for type in supported_types])}",
-                    )
+        while len(stack) != 0:
+            expr, lowered_children = stack.pop()
 
-                if lhs.get_type() != rhs.get_type():
-                    lhs.get_diagnoster().error_panic(
-                        ErrorKind.Invalid,
-                        "binary operation: expected the two hand sides to be of the same type",
-                    )
+            match expr:
+                case integerexpr if isinstance(integerexpr, Integer):
+                    values.append(IRInteger(integerexpr.value, integerexpr.diagnoster))
+                case floatexpr if isinstance(floatexpr, Float):
+                    values.append(IRFloat(floatexpr.value, floatexpr.diagnoster))
+                case ident if isinstance(ident, Identifier):
+                    parameter = self.current_parameters.get(ident.value)
 
-                match binaryop.operator.kind:
-                    case TokenKind.Plus:
-                        return IRAdd(lhs, rhs, binaryop.get_diagnoster())
-                    case TokenKind.Minus:
-                        return IRSub(lhs, rhs, binaryop.get_diagnoster())
-                    case TokenKind.Star:
-                        return IRMul(lhs, rhs, binaryop.get_diagnoster())
-                    case TokenKind.ForwardSlash:
-                        return IRDiv(lhs, rhs, binaryop.get_diagnoster())
-                    case _:
-                        binaryop.operator.diagnoster.error_panic(
-                            ErrorKind.Invalid, "binary operator"
+                    if parameter == None:
+                        ident.diagnoster.error_panic(
+                            ErrorKind.Invalid, f"identifier: {ident.value} is undefined"
                         )
-            case callexpr if isinstance(callexpr, Call):
-                match callexpr.callable:
-                    case ident if isinstance(ident, Identifier):
-                        block_index = self.code.get_block(ident.value)
-                        if block_index == None:
-                            callexpr.get_diagnoster().error_panic(
-                                ErrorKind.Invalid,
-                                f"call: {ident.value} is not a function",
-                            )
-
-                        block_reference = IRBlockReference(
-                            block_index,
-                            self.code.blocks[block_index].signature,
-                            ident.diagnoster,
+
+                    values.append(
+                        IRParameter(parameter[0], parameter[1], ident.diagnoster)
+                    )
+                case stringexpr if isinstance(stringexpr, String):
+                    index = self.code.add_string_literal(
+                        IRStringLiteral(stringexpr.value)
+                    )
+                    values.append(IRStringReference(index, stringexpr.diagnoster))
+                case binaryop if isinstance(binaryop, BinaryOperation):
+                    if not lowered_children:
+                        stack.append((binaryop, True))
+                        stack.append((binaryop.rhs, False))
+                        stack.append((binaryop.lhs, False))
+                        continue
+
+                    rhs = values.pop()
+                    lhs = values.pop()
+                    values.append(self.generate_binary_operation(binaryop, lhs, rhs))
+                case callexpr if isinstance(callexpr, Call):
+                    if not lowered_children:
+                        # The callee is resolved before any argument is lowered
+                        self.get_callee(callexpr)
+
+                        stack.append((callexpr, True))
+                        stack.extend(
+                            (argument, False)
+                            for argument in reversed(callexpr.arguments)
                         )
+                        continue
 
-                        arguments = [
-                            self.generate_expr(arg) for arg in callexpr.arguments
-                        ]
+                    arguments = values[len(values) - len(callexpr.arguments) :]
+                    del values[len(values) - len(callexpr.arguments) :]
 
-                        return IRCall(block_reference, arguments)
-                    case _:
-                        callexpr.get_diagnoster().error_panic(
-                            ErrorKind.Invalid,
-                            f"call: {callexpr.callable} is not a callable",
-                        )
+                    values.append(IRCall(self.get_callee(callexpr), arguments))
+                case _:
+                    expr.get_diagnoster().error_panic(
+                        ErrorKind.Unspported, "expression conversion from ast to ir"
+                    )
+
+        return values.pop()
+
+    def generate_binary_operation(
+        self, binaryop: BinaryOperation, lhs: IRValue, rhs: IRValue
+    ) -> IRBinaryOperation:
+        supported_types = [Type.Integer, Type.Float]
+
+        if lhs.get_type() not in supported_types:
+            lhs.get_diagnoster().error_panic(
+                ErrorKind.Invalid,
+                f"binary operation: expected the left hand side to be of type {' or '.join([str(type) for type in supported_types])}",
+            )
+
+        if rhs.get_type() not in supported_types:
+            rhs.get_diagnoster().error_panic(
+                ErrorKind.Invalid,
+                f"binary operation: expected the right hand side to be of type {' or '.join([str(type) for type in supported_types])}",
+            )
+
+        if lhs.get_type() != rhs.get_type():
+            lhs.get_diagnoster().error_panic(
+                ErrorKind.Invalid,
+                "binary operation: expected the two hand sides to be of the same type",
+            )
+
+        match binaryop.operator.kind:
+            case TokenKind.Plus:
+                return IRAdd(lhs, rhs, binaryop.get_diagnoster())
+            case TokenKind.Minus:
+                return IRSub(lhs, rhs, binaryop.get_diagnoster())
+            case TokenKind.Star:
+                return IRMul(lhs, rhs, binaryop.get_diagnoster())
+            case TokenKind.ForwardSlash:
+                return IRDiv(lhs, rhs, binaryop.get_diagnoster())
+            case _:
+                binaryop.operator.diagnoster.error_panic(
+                    ErrorKind.Invalid, "binary operator"
+                )
+
+    def get_callee(self, callexpr: Call) -> IRBlockReference:
+        match callexpr.callable:
+            case ident if isinstance(ident, Identifier):
+                block_index = self.code.get_block(ident.value)
+                if block_index == None:
+                    callexpr.get_diagnoster().error_panic(
+                        ErrorKind.Invalid,
+                        f"call: {ident.value} is not a function",
+                    )
+
+                return IRBlockReference(
+                    block_index,
+                    self.code.blocks[block_index].signature,
+                    ident.diagnoster,
+                )
             case _:
-                expr.get_diagnoster().error_panic(
-                    ErrorKind.Unspported, "expression conversion from ast to ir"
+                callexpr.get_diagnoster().error_panic(
+                    ErrorKind.Invalid,
+                    f"call: {callexpr.callable} is not a callable",
                 )
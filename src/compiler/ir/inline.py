@@ -0,0 +1,357 @@
+from dataclasses import dataclass
+from ..errors import ErrorKind
+from .code import *
+
+# Nodes allowed in the returned expression of a function worth inlining
+INLINE_SIZE_LIMIT = 16
+
+# How much the whole program may grow through inlining, relative to its size
+INLINE_GROWTH_PERCENT = 50
+
+
+def value_size(value: IRValue) -> int:
+    size = 0
+    stack = [value]
+
+    while len(stack) != 0:
+        value = stack.pop()
+        size += 1
+
+        match value:
+            case binop if isinstance(binop, IRBinaryOperation):
+                stack.append(binop.lhs)
+                stack.append(binop.rhs)
+            case call if isinstance(call, IRCall):
+                stack.extend(call.arguments)
+            case _:
+                ...
+
+    return size
+
+
+def find_calls(value: IRValue) -> list[IRCall]:
+    calls = []
+    stack = [value]
+
+    while len(stack) != 0:
+        value = stack.pop()
+
+        match value:
+            case binop if isinstance(binop, IRBinaryOperation):
+                stack.append(binop.rhs)
+                stack.append(binop.lhs)
+            case call if isinstance(call, IRCall):
+                calls.append(call)
+            case _:
+                ...
+
+    return calls
+
+
+def count_parameters(value: IRValue, parameters: int) -> list[int]:
+    uses = [0] * parameters
+    stack = [value]
+
+    while len(stack) != 0:
+        value = stack.pop()
+
+        match value:
+            case parameter if isinstance(parameter, IRParameter):
+                uses[parameter.index] += 1
+            case binop if isinstance(binop, IRBinaryOperation):
+                stack.append(binop.lhs)
+                stack.append(binop.rhs)
+            case _:
+                ...
+
+    return uses
+
+
+def copy_value(value: IRValue, arguments: list[IRValue] | None = None) -> IRValue:
+    """
+    Copies a value in post order over an explicit stack, replacing parameters
+    with the given arguments. Later passes rewrite values in place, so nothing
+    may be shared, the first use of an argument takes it as it is and every
+    other use takes a copy of it.
+    """
+
+    values: list[IRValue] = []
+    moved = [False] * (len(arguments) if arguments != None else 0)
+    stack: list[tuple[IRValue, list[IRValue] | None, bool]] = [
+        (value, arguments, False)
+    ]
+
+    while len(stack) != 0:
+        value, arguments, copied_children = stack.pop()
+
+        match value:
+            case parameter if isinstance(parameter, IRParameter):
+                if arguments == None:
+                    values.append(
+                        IRParameter(
+                            parameter.index, parameter.type, parameter.diagnoster
+                        )
+                    )
+                elif not moved[parameter.index]:
+                    moved[parameter.index] = True
+                    values.append(arguments[parameter.index])
+                else:
+                    # The parameters of an argument belong to the caller, they
+                    # are copied as they are
+                    stack.append((arguments[parameter.index], None, False))
+            case integer if isinstance(integer, IRInteger):
+                values.append(IRInteger(integer.value, integer.diagnoster))
+            case floatv if isinstance(floatv, IRFloat):
+                values.append(IRFloat(floatv.value, floatv.diagnoster))
+            case stringref if isinstance(stringref, IRStringReference):
+                values.append(IRStringReference(stringref.index, stringref.diagnoster))
+            case binop if isinstance(binop, IRBinaryOperation):
+                if not copied_children:
+                    stack.append((binop, arguments, True))
+                    stack.append((binop.rhs, arguments, False))
+                    stack.append((binop.lhs, arguments, False))
+                    continue
+
+                rhs = values.pop()
+                lhs = values.pop()
+                values.append(type(binop)(lhs, rhs, binop.diagnoster))
+            case call if isinstance(call, IRCall):
+                if not copied_children:
+                    stack.append((call, arguments, True))
+                    stack.extend(
+                        (argument, arguments, False)
+                        for argument in reversed(call.arguments)
+                    )
+                    continue
+
+                copied_arguments = values[len(values) - len(call.arguments) :]
+                del values[len(values) - len(call.arguments) :]
+
+                values.append(
+                    IRCall(
+                        IRBlockReference(
+                            call.callable.index,
+                            call.callable.signature,
+                            call.callable.diagnoster,
+                        ),
+                        copied_arguments,
+                    )
+                )
+            case _:
+                value.get_diagnoster().error_panic(
+                    ErrorKind.Unspported, "value copy while inlining"
+                )
+
+    return values.pop()
+
+
+@dataclass()
+class Inliner:
+    """
+    Inlines calls to small leaf functions, those whose body is a single return
+    of an expression without calls, and calls to empty void functions. Callers
+    may become leaves themselves, so this runs until nothing changes or the
+    growth budget is spent.
+    """
+
+    code: IRCode
+    size_limit: int = INLINE_SIZE_LIMIT
+    growth_percent: int = INLINE_GROWTH_PERCENT
+    inlined: int = 0
+    growth: int = 0
+    budget: int = 0
+
+    def run(self):
+        self.budget = (
+            sum(self.block_size(block) for block in self.code.blocks)
+            * self.growth_percent
+            // 100
+            + self.size_limit
+        )
+
+        while self.growth < self.budget:
+            inlined = self.inlined
+            bodies = {
+                i: self.get_inlinable_body(block)
+                for i, block in enumerate(self.code.blocks)
+                if self.is_inlinable(block)
+            }
+
+            if len(bodies) == 0:
+                break
+
+            for block in self.code.blocks:
+                self.inline_block(block, bodies)
+
+            if self.inlined == inlined:
+                break
+
+    def block_size(self, block: IRBlock) -> int:
+        size = 0
+
+        for instruction in block.instructions:
+            match instruction:
+                case ret if isinstance(ret, IRReturn):
+                    size += value_size(ret.value) + 1
+                case call if isinstance(call, IRCall):
+                    size += value_size(call)
+                case _:
+                    size += 1
+
+        return size
+
+    def is_inlinable(self, block: IRBlock) -> bool:
+        if len(block.instructions) == 0:
+            return block.signature.return_type == Type.Void
+
+        if len(block.instructions) != 1 or not isinstance(
+            block.instructions[0], IRReturn
+        ):
+            return False
+
+        value = block.instructions[0].value
+
+        return value_size(value) <= self.size_limit and len(find_calls(value)) == 0
+
+    def get_inlinable_body(self, block: IRBlock) -> IRValue | None:
+        if len(block.instructions) == 0:
+            return None
+
+        return block.instructions[0].value
+
+    def inline_block(self, block: IRBlock, bodies: dict[int, IRValue | None]):
+        instructions = []
+
+        for instruction in block.instructions:
+            match instruction:
+                case ret if isinstance(ret, IRReturn):
+                    ret.value = self.inline(ret.value, bodies)
+                    instructions.append(ret)
+                case call if isinstance(call, IRCall):
+                    call.arguments = [
+                        self.inline(argument, bodies) for argument in call.arguments
+                    ]
+
+                    if self.can_inline(
+                        call,
+                        bodies,
+                        [len(find_calls(argument)) != 0 for argument in call.arguments],
+                    ):
+                        # The result is discarded, only calls in the arguments
+                        # still have to happen
+                        self.inlined += 1
+
+                        for argument in call.arguments:
+                            instructions.extend(find_calls(argument))
+                    else:
+                        instructions.append(call)
+                case _:
+                    instructions.append(instruction)
+
+        block.instructions = instructions
+
+    def inline(self, value: IRValue, bodies: dict[int, IRValue | None]) -> IRValue:
+        """
+        Inlines the calls of a value in post order over an explicit stack, the
+        arguments of a call are inlined before the call itself. The size of
+        every value and whether it still has calls are worked out on the way
+        up, so deciding on a call does not walk its arguments again.
+        """
+
+        values: list[tuple[IRValue, int, bool]] = []
+        stack: list[tuple[IRValue, bool]] = [(value, False)]
+
+        while len(stack) != 0:
+            value, inlined_children = stack.pop()
+
+            match value:
+                case binop if isinstance(binop, IRBinaryOperation):
+                    if not inlined_children:
+                        stack.append((binop, True))
+                        stack.append((binop.rhs, False))
+                        stack.append((binop.lhs, False))
+                        continue
+
+                    binop.rhs, rhs_size, rhs_calls = values.pop()
+                    binop.lhs, lhs_size, lhs_calls = values.pop()
+                    values.append(
+                        (binop, lhs_size + rhs_size + 1, lhs_calls or rhs_calls)
+                    )
+                case call if isinstance(call, IRCall):
+                    if not inlined_children:
+                        stack.append((call, True))
+                        stack.extend(
+                            (argument, False) for argument in reversed(call.arguments)
+                        )
+                        continue
+
+                    arguments = values[len(values) - len(call.arguments) :]
+                    del values[len(values) - len(call.arguments) :]
+
+                    call.arguments = [argument for argument, _, _ in arguments]
+                    values.append(self.inline_call(call, bodies, arguments))
+                case _:
+                    values.append((value, 1, False))
+
+        return values.pop()[0]
+
+    def inline_call(
+        self,
+        call: IRCall,
+        bodies: dict[int, IRValue | None],
+        arguments: list[tuple[IRValue, int, bool]],
+    ) -> tuple[IRValue, int, bool]:
+        sizes = [size for _, size, _ in arguments]
+        argument_calls = [has_calls for _, _, has_calls in arguments]
+        body = bodies.get(call.callable.index)
+
+        if body == None or not self.can_inline(call, bodies, argument_calls):
+            return (call, sum(sizes) + 1, True)
+
+        uses = count_parameters(body, len(call.arguments))
+        body_size = value_size(body)
+        growth = body_size - 1 + sum(size * (use - 1) for size, use in zip(sizes, uses))
+
+        if self.growth + growth > self.budget:
+            return (call, sum(sizes) + 1, True)
+
+        self.growth += growth
+        self.inlined += 1
+
+        # Every parameter is replaced by a copy of its argument
+        return (
+            copy_value(body, call.arguments),
+            body_size + sum((size - 1) * use for size, use in zip(sizes, uses)),
+            any(has_calls and use != 0 for has_calls, use in zip(argument_calls, uses)),
+        )
+
+    def can_inline(
+        self,
+        call: IRCall,
+        bodies: dict[int, IRValue | None],
+        argument_calls: list[bool],
+    ) -> bool:
+        if call.callable.index not in bodies:
+            return False
+
+        signature = call.callable.signature
+
+        # Mismatched calls are left for the code generator to report
+        if len(call.arguments) != len(signature.parameters_types):
+            return False
+
+        for argument, parameter_type in zip(call.arguments, signature.parameters_types):
+            if argument.get_type() != parameter_type:
+                return False
+
+        body = bodies[call.callable.index]
+
+        if body == None:
+            return True
+
+        uses = count_parameters(body, len(call.arguments))
+
+        # Calls in an argument must still run exactly once
+        return all(
+            use == 1 or not has_calls for has_calls, use in zip(argument_calls, uses)
+        )
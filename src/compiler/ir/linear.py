@@ -0,0 +1,352 @@
+from dataclasses import dataclass, field
+from typing import Callable
+import enum
+from ..errors import ErrorKind
+from .code import *
+
+# Calls clobber every caller saved register, so subexpressions containing one
+# are always evaluated before their siblings
+CALL_NEED = 1 << 16
+
+
+class LinearOpcode(enum.Enum):
+    Integer = enum.auto()
+    Float = enum.auto()
+    String = enum.auto()
+    Parameter = enum.auto()
+
+    Add = enum.auto()
+    Sub = enum.auto()
+    Mul = enum.auto()
+    Div = enum.auto()
+
+    Call = enum.auto()
+    Return = enum.auto()
+
+
+BINARY_OPCODES = {
+    IRAdd: LinearOpcode.Add,
+    IRSub: LinearOpcode.Sub,
+    IRMul: LinearOpcode.Mul,
+    IRDiv: LinearOpcode.Div,
+}
+
+
+@dataclass(slots=True)
+class LinearInstruction:
+    """
+    A single three address instruction. Registers are numbered per block, the
+    value is the constant of a load, the index of a string literal, parameter
+    or called block, or the immediate right hand side of an operation.
+    """
+
+    opcode: LinearOpcode
+    out: int | None
+    operands: tuple[int, ...]
+    value: int | float | None
+    diagnoster: Diagnoster
+
+
+@dataclass(slots=True)
+class LinearBlock:
+    name: str
+    signature: IRBlockSignature
+    instructions: list[LinearInstruction] = field(default_factory=list)
+    register_types: list[Type] = field(default_factory=list)
+
+    def add_register(self, register_type: Type) -> int:
+        self.register_types.append(register_type)
+
+        return len(self.register_types) - 1
+
+
+@dataclass()
+class LinearCode:
+    diagnoster: Diagnoster
+    blocks: list[LinearBlock] = field(default_factory=list)
+    string_literals: list[IRStringLiteral] = field(default_factory=list)
+    block_indices: dict[str, int] = field(default_factory=dict)
+
+    def get_block(self, name: str) -> int | None:
+        return self.block_indices.get(name)
+
+
+@dataclass()
+class LinearLowering:
+    """
+    Flattens the tree IR into linear blocks. Operands are evaluated in the
+    order needing the fewest registers, and integers the target accepts as
+    immediate operands of additions and subtractions are kept in the
+    instruction instead of a register.
+    """
+
+    code: IRCode
+    fits_immediate_operand: Callable[[int], bool] = lambda value: False
+    needs: dict[int, int] = field(default_factory=dict)
+
+    def run(self) -> LinearCode:
+        linear_code = LinearCode(
+            self.code.diagnoster,
+            string_literals=self.code.string_literals,
+            block_indices=dict(self.code.block_indices),
+        )
+
+        for block in self.code.blocks:
+            linear_code.blocks.append(self.lower_block(block))
+            self.needs.clear()
+
+        return linear_code
+
+    def lower_block(self, block: IRBlock) -> LinearBlock:
+        linear_block = LinearBlock(block.name, block.signature)
+
+        for i, parameter_type in enumerate(block.signature.parameters_types):
+            linear_block.instructions.append(
+                LinearInstruction(
+                    LinearOpcode.Parameter,
+                    linear_block.add_register(parameter_type),
+                    (),
+                    i,
+                    self.code.diagnoster,
+                )
+            )
+
+        for instruction in block.instructions:
+            match instruction:
+                case call if isinstance(call, IRCall):
+                    self.lower_value(linear_block, call, False)
+                case ret if isinstance(ret, IRReturn):
+                    linear_block.instructions.append(
+                        LinearInstruction(
+                            LinearOpcode.Return,
+                            None,
+                            (self.lower_value(linear_block, ret.value),),
+                            None,
+                            ret.diagnoster,
+                        )
+                    )
+                case _:
+                    instruction.get_diagnoster().error_panic(
+                        ErrorKind.Unspported, "instruction conversion to linear ir"
+                    )
+
+        return linear_block
+
+    def lower_value(
+        self, block: LinearBlock, value: IRValue, has_result: bool = True
+    ) -> int | None:
+        """
+        Appends the instructions computing a value in post order over an
+        explicit stack, children leave their registers on the results stack.
+        """
+
+        results: list[int | None] = []
+        stack: list[tuple[IRValue, list | None]] = [(value, None)]
+
+        while len(stack) != 0:
+            value, plan = stack.pop()
+
+            match value:
+                case integer if isinstance(integer, IRInteger):
+                    results.append(self.add_load(block, LinearOpcode.Integer, integer))
+                case floatv if isinstance(floatv, IRFloat):
+                    results.append(self.add_load(block, LinearOpcode.Float, floatv))
+                case stringref if isinstance(stringref, IRStringReference):
+                    out = block.add_register(Type.String)
+                    block.instructions.append(
+                        LinearInstruction(
+                            LinearOpcode.String,
+                            out,
+                            (),
+                            stringref.index,
+                            stringref.diagnoster,
+                        )
+                    )
+                    results.append(out)
+                case parameter if isinstance(parameter, IRParameter):
+                    results.append(parameter.index)
+                case binop if isinstance(binop, IRBinaryOperation):
+                    if plan == None:
+                        if type(binop) not in BINARY_OPCODES:
+                            binop.get_diagnoster().error_panic(
+                                ErrorKind.Unspported,
+                                "binary operation conversion to linear ir",
+                            )
+
+                        plan = self.order_operands(binop)
+                        stack.append((binop, plan))
+                        stack.extend((operand, None) for operand in reversed(plan))
+                        continue
+
+                    immediate = self.split_immediate_operand(binop)
+
+                    if immediate != None:
+                        operands = (results.pop(),)
+                    elif plan[0] is binop.rhs:
+                        operands = (results.pop(), results.pop())
+                    else:
+                        rhs = results.pop()
+                        operands = (results.pop(), rhs)
+
+                    out = block.add_register(binop.get_type())
+                    block.instructions.append(
+                        LinearInstruction(
+                            BINARY_OPCODES[type(binop)],
+                            out,
+                            operands,
+                            None if immediate == None else immediate[1],
+                            binop.diagnoster,
+                        )
+                    )
+                    results.append(out)
+                case call if isinstance(call, IRCall):
+                    if plan == None:
+                        plan = self.order_arguments(call)
+                        stack.append((call, plan))
+                        stack.extend((call.arguments[i], None) for i in reversed(plan))
+                        continue
+
+                    registers = [0] * len(plan)
+
+                    for i in reversed(plan):
+                        registers[i] = results.pop()
+
+                    out = None
+
+                    # Only the outermost call of a statement discards its result
+                    if has_result or len(stack) != 0:
+                        out = block.add_register(call.get_type())
+
+                    block.instructions.append(
+                        LinearInstruction(
+                            LinearOpcode.Call,
+                            out,
+                            tuple(registers),
+                            call.callable.index,
+                            call.get_diagnoster(),
+                        )
+                    )
+                    results.append(out)
+                case _:
+                    value.get_diagnoster().error_panic(
+                        ErrorKind.Unspported, "value conversion to linear ir"
+                    )
+
+        return results.pop()
+
+    def add_load(
+        self, block: LinearBlock, opcode: LinearOpcode, value: IRInteger | IRFloat
+    ) -> int:
+        out = block.add_register(value.get_type())
+        block.instructions.append(
+            LinearInstruction(opcode, out, (), value.value, value.diagnoster)
+        )
+
+        return out
+
+    def order_operands(self, binop: IRBinaryOperation) -> list[IRValue]:
+        operands = self.split_immediate_operand(binop)
+
+        if operands != None:
+            return [operands[0]]
+
+        if self.get_need(binop.rhs) > self.get_need(binop.lhs):
+            return [binop.rhs, binop.lhs]
+
+        return [binop.lhs, binop.rhs]
+
+    def order_arguments(self, call: IRCall) -> list[int]:
+        """
+        Checks a call against its callee and orders its arguments, those
+        needing the most registers go first, while the rest are still
+        unevaluated and hold no registers.
+        """
+
+        match call.callable:
+            case br if isinstance(br, IRBlockReference):
+                block = self.code.blocks[br.index]
+            case _:
+                call.get_diagnoster().error_panic(ErrorKind.Invalid, "callable")
+
+        if len(call.arguments) != len(block.signature.parameters_types):
+            call.get_diagnoster().error_panic(
+                ErrorKind.Invalid,
+                f"call: expected {len(block.signature.parameters_types)} {'arguments' if len(block.signature.parameters_types) != 1 else 'argument'} got {len(call.arguments)}",
+            )
+
+        for i, parameter_type in enumerate(block.signature.parameters_types):
+            if call.arguments[i].get_type() != parameter_type:
+                call.get_diagnoster().error_panic(
+                    ErrorKind.Types,
+                    f"mismatched: expected argument at position {i} to be of type {parameter_type} but got argument of type {call.arguments[i].get_type()}",
+                )
+
+        return sorted(
+            range(len(call.arguments)),
+            key=lambda i: self.get_need(call.arguments[i]),
+            reverse=True,
+        )
+
+    def get_need(self, value: IRValue) -> int:
+        """
+        The Sethi-Ullman number of a value, the registers needed to evaluate it
+        without spilling.
+        """
+
+        root = value
+        stack = [(value, False)]
+
+        while len(stack) != 0:
+            value, visited = stack.pop()
+
+            if id(value) in self.needs:
+                continue
+
+            match value:
+                case binop if isinstance(binop, IRBinaryOperation):
+                    operands = self.split_immediate_operand(binop)
+                    children = (
+                        [operands[0]] if operands != None else [binop.lhs, binop.rhs]
+                    )
+
+                    if not visited:
+                        stack.append((binop, True))
+                        stack.extend((child, False) for child in children)
+                        continue
+
+                    needs = [self.needs[id(child)] for child in children]
+
+                    if len(needs) == 2 and needs[0] == needs[1]:
+                        need = needs[0] + 1
+                    else:
+                        need = max(needs)
+                # Arguments get their own needs when the call is lowered
+                case call if isinstance(call, IRCall):
+                    need = CALL_NEED
+                case _:
+                    need = 1
+
+            self.needs[id(value)] = need
+
+        return self.needs[id(root)]
+
+    def split_immediate_operand(
+        self, binop: IRBinaryOperation
+    ) -> tuple[IRValue, int] | None:
+        if not isinstance(binop, (IRAdd, IRSub)):
+            return None
+
+        if isinstance(binop.rhs, IRInteger) and self.fits_immediate_operand(
+            binop.rhs.value
+        ):
+            return (binop.lhs, binop.rhs.value)
+
+        # Addition commutes, so an immediate on the left can be swapped over
+        if (
+            isinstance(binop, IRAdd)
+            and isinstance(binop.lhs, IRInteger)
+            and self.fits_immediate_operand(binop.lhs.value)
+        ):
+            return (binop.rhs, binop.lhs.value)
+
+        return None
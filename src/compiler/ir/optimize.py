@@ -0,0 +1,40 @@
+from dataclasses import dataclass, field
+from .code import IRCode
+from .ctfe import CompileTimeEvaluator
+from .dce import DeadFunctionEliminator
+from .fold import ConstantFolder
+from .inline import Inliner
+
+
+@dataclass()
+class Optimizer:
+    code: IRCode
+    level: int
+    exported: list[str] = field(default_factory=list)
+    inliner: Inliner = field(init=False)
+    constant_folder: ConstantFolder = field(init=False)
+    compile_time_evaluator: CompileTimeEvaluator = field(init=False)
+    dead_function_eliminator: DeadFunctionEliminator = field(init=False)
+
+    def __post_init__(self):
+        self.inliner = Inliner(self.code)
+        self.constant_folder = ConstantFolder(self.code)
+        self.compile_time_evaluator = CompileTimeEvaluator(self.code)
+        self.dead_function_eliminator = DeadFunctionEliminator(self.code, self.exported)
+
+    def run(self):
+        # Inlining first, so folding sees the constants substituted into bodies
+        if self.level >= 2:
+            self.inliner.run()
+
+        if self.level >= 1:
+            self.constant_folder.run()
+
+        # Calls only become evaluable once their arguments are folded, and
+        # their results can be folded further
+        if self.level >= 2:
+            self.compile_time_evaluator.run()
+            self.constant_folder.run()
+
+        if self.level >= 1:
+            self.dead_function_eliminator.run()
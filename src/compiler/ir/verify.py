@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from ..errors import ErrorKind
+from .code import *
+
+ARITHMETIC_TYPES = [Type.Integer, Type.Float]
+
+
+@dataclass()
+class IRVerifier:
+    """
+    Checks once that the IR is consistent, mainly that the types cached on the
+    values when they were built still agree with their operands. Mismatched
+    call arguments are user errors reported when lowering to linear IR, so
+    they are not checked here.
+    """
+
+    code: IRCode
+
+    def run(self):
+        for block in self.code.blocks:
+            for instruction in block.instructions:
+                match instruction:
+                    case ret if isinstance(ret, IRReturn):
+                        if ret.value.get_type() != block.signature.return_type:
+                            self.fail(ret, "return type differs from the signature")
+
+                        self.verify(block, ret.value)
+                    case call if isinstance(call, IRCall):
+                        self.verify(block, call)
+                    case _:
+                        self.fail(instruction, "unknown instruction")
+
+    def verify(self, block: IRBlock, value: IRValue):
+        stack = [value]
+
+        while len(stack) != 0:
+            value = stack.pop()
+
+            match value:
+                case binop if isinstance(binop, IRBinaryOperation):
+                    if binop.get_type() not in ARITHMETIC_TYPES:
+                        self.fail(binop, "binary operation on a non arithmetic type")
+
+                    if (
+                        binop.lhs.get_type() != binop.get_type()
+                        or binop.rhs.get_type() != binop.get_type()
+                    ):
+                        self.fail(binop, "binary operation type differs from operands")
+
+                    stack.append(binop.rhs)
+                    stack.append(binop.lhs)
+                case call if isinstance(call, IRCall):
+                    index = call.callable.index
+
+                    if not 0 <= index < len(self.code.blocks):
+                        self.fail(call, "call to a missing block")
+
+                    if call.callable.signature != self.code.blocks[index].signature:
+                        self.fail(call, "call signature differs from the block")
+
+                    stack.extend(reversed(call.arguments))
+                case parameter if isinstance(parameter, IRParameter):
+                    parameters_types = block.signature.parameters_types
+
+                    if not 0 <= parameter.index < len(parameters_types):
+                        self.fail(parameter, "reference to a missing parameter")
+
+                    if parameters_types[parameter.index] != parameter.get_type():
+                        self.fail(parameter, "parameter type differs from signature")
+                case stringref if isinstance(stringref, IRStringReference):
+                    if not 0 <= stringref.index < len(self.code.string_literals):
+                        self.fail(stringref, "reference to a missing string literal")
+                case _:
+                    ...
+
+    def fail(self, node: IRValue | IRInstruction, message: str):
+        node.get_diagnoster().error_panic(ErrorKind.Invalid, f"ir: {message}")
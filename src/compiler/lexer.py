@@ -1,8 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import enum
-from typing import Any
-from copy import deepcopy
+import mmap
+import re
+from typing import Any, Iterator, Never
 from .errors import Diagnoster, ErrorKind
+from .source import FileTable
 
 
 class TokenKind(enum.Enum):
@@ -28,109 +30,170 @@ class TokenKind(enum.Enum):
     EOF = enum.auto()
 
 
-@dataclass()
+@dataclass(slots=True)
 class Token:
-    diagnoster: Diagnoster
     kind: TokenKind
+    files: FileTable = field(repr=False)
+    file_id: int
+    offset: int
     value: Any = ""
 
+    @property
+    def diagnoster(self) -> Diagnoster:
+        return Diagnoster(self.files, self.file_id, self.offset)
+
+
+# Keyed by byte value, the lexer indexes the source bytes directly
+PUNCTUATION = {
+    ord("("): TokenKind.OpenParen,
+    ord(")"): TokenKind.CloseParen,
+    ord("{"): TokenKind.OpenBrace,
+    ord("}"): TokenKind.CloseBrace,
+    ord(":"): TokenKind.Colon,
+    ord("."): TokenKind.Period,
+    ord(","): TokenKind.Comma,
+    ord("+"): TokenKind.Plus,
+    ord("-"): TokenKind.Minus,
+    ord("*"): TokenKind.Star,
+    ord("/"): TokenKind.ForwardSlash,
+}
+
+# A single master pattern, tried at the current offset, replaces the old
+# character-by-character scanning so that lexing stays linear in the input size.
+# It runs over the UTF-8 bytes, any run of non-ASCII bytes is taken as part of
+# an identifier and checked against IDENTIFIER_PATTERN once decoded.
+TOKEN_PATTERN = re.compile(
+    rb"""
+      (?P<space>\s+)
+    | "(?P<string>[^"]*)"
+    | (?P<number>\d[\d.]*)
+    | (?P<ident>[A-Za-z_\x80-\xff][\w\x80-\xff]*)
+    | (?P<punctuation>[(){}:.,+\-*/])
+    """,
+    re.VERBOSE,
+)
+
+IDENTIFIER_PATTERN = re.compile(r"[^\W\d]\w*")
+
 
 @dataclass()
 class Lexer:
-    chars: list[str]
+    # The UTF-8 source, usually a read only map of the file
+    source: bytes | mmap.mmap
     diagnoster: Diagnoster
 
     def tokenize(self) -> list[Token]:
-        tokens = []
-
-        while len(self.chars) != 0:
-            match self.chars.pop(0):
-                case "(":
-                    tokens.append(Token(deepcopy(self.diagnoster), TokenKind.OpenParen))
-                case ")":
-                    tokens.append(
-                        Token(deepcopy(self.diagnoster), TokenKind.CloseParen)
-                    )
-                case "{":
-                    tokens.append(Token(deepcopy(self.diagnoster), TokenKind.OpenBrace))
-                case "}":
-                    tokens.append(
-                        Token(deepcopy(self.diagnoster), TokenKind.CloseBrace)
+        return list(self.stream())
+
+    def stream(self) -> Iterator[Token]:
+        source = self.source
+        files = self.diagnoster.files
+        file_id = self.diagnoster.file_id
+        match_token = TOKEN_PATTERN.match
+        # Identifiers are decoded once, every later occurrence shares the str
+        identifiers: dict[bytes, str] = {}
+
+        # Only offsets are tracked, lines and columns are left to the file
+        # table for when an error is reported
+        offset = 0
+
+        while offset < len(source):
+            m = match_token(source, offset)
+
+            if m is None:
+                if source[offset] == ord('"'):
+                    Diagnoster(files, file_id, offset).error_panic(
+                        ErrorKind.Invalid, "string: unterminated string literal"
                     )
-                case ":":
-                    tokens.append(Token(deepcopy(self.diagnoster), TokenKind.Colon))
-                case ".":
-                    tokens.append(Token(deepcopy(self.diagnoster), TokenKind.Period))
-                case ",":
-                    tokens.append(Token(deepcopy(self.diagnoster), TokenKind.Comma))
-                case "+":
-                    tokens.append(Token(deepcopy(self.diagnoster), TokenKind.Plus))
-                case "-":
-                    tokens.append(Token(deepcopy(self.diagnoster), TokenKind.Minus))
-                case "*":
-                    tokens.append(Token(deepcopy(self.diagnoster), TokenKind.Star))
-                case "/":
-                    tokens.append(
-                        Token(deepcopy(self.diagnoster), TokenKind.ForwardSlash)
-                    )
-                case '"':
-                    tokens.append(self.read_string())
-                case c if c.isdigit():
-                    tokens.append(self.read_number(c))
-                case c if c.isalpha() or c == "_":
-                    tokens.append(self.read_ident(c))
-                case c if c.isspace():
-                    if c == "\n":
-                        self.diagnoster.position.line += 1
-                        self.diagnoster.position.column = 1
-                    continue
-                case c:
-                    self.diagnoster.error_panic(ErrorKind.Invalid, f"token '{c}'")
 
-            self.diagnoster.position.column += 1
+                self.invalid_token(offset)
 
-        tokens.append(Token(deepcopy(self.diagnoster), TokenKind.EOF))
+            match m.lastgroup:
+                case "space":
+                    offset = m.end()
+                    continue
+                case "string":
+                    yield self.read_string(
+                        Token(TokenKind.String, files, file_id, offset),
+                        m.group("string"),
+                    )
+                case "number":
+                    yield self.read_number(
+                        Token(TokenKind.Integer, files, file_id, offset), m.group()
+                    )
+                case "ident":
+                    text = m.group()
+                    identifier = identifiers.get(text)
 
-        return tokens
+                    if identifier == None:
+                        identifier = self.read_identifier(offset, text)
+                        identifiers[identifier.encode()] = identifier
 
-    def read_string(self) -> Token:
-        literal = ""
+                    yield Token(
+                        TokenKind.Identifier, files, file_id, offset, identifier
+                    )
 
-        while True:
-            c = self.chars.pop(0)
+                    offset += len(identifier.encode())
+                    continue
+                case _:
+                    yield Token(PUNCTUATION[source[offset]], files, file_id, offset)
 
-            if c == '"':
-                break
+            offset = m.end()
 
-            literal += c
+        yield Token(TokenKind.EOF, files, file_id, offset)
 
-        return Token(deepcopy(self.diagnoster), TokenKind.String, literal)
+    def read_identifier(self, offset: int, text: bytes) -> str:
+        identifier = text.decode(errors="replace")
 
-    def read_number(self, first_char: str) -> Token:
-        literal = first_char
+        if text.isascii():
+            return identifier
 
-        while True:
-            c = self.chars[0]
+        m = IDENTIFIER_PATTERN.match(identifier)
 
-            if c.isdigit() or c == ".":
-                literal += self.chars.pop(0)
-            else:
-                break
+        if m is None:
+            self.invalid_token(offset)
 
-        if "." in literal:
-            return Token(deepcopy(self.diagnoster), TokenKind.Float, float(literal))
-        else:
-            return Token(deepcopy(self.diagnoster), TokenKind.Integer, int(literal))
+        # The bytes matched may run past the identifier into other non-ASCII
+        # characters, the caller continues after the decoded identifier
+        return m.group()
 
-    def read_ident(self, first_char: str) -> Token:
-        literal = first_char
+    def read_string(self, token: Token, literal: bytes) -> Token:
+        try:
+            token.value = literal.decode()
+        except UnicodeDecodeError as e:
+            token.diagnoster.error_panic(
+                ErrorKind.Invalid,
+                f"string: invalid UTF-8 byte '\\x{literal[e.start]:02x}'",
+            )
 
-        while True:
-            c = self.chars[0]
+        return token
 
-            if c.isalnum() or c == "_":
-                literal += self.chars.pop(0)
+    def read_number(self, token: Token, literal: bytes) -> Token:
+        try:
+            if b"." in literal:
+                token.kind = TokenKind.Float
+                token.value = float(literal)
             else:
-                break
+                token.value = int(literal)
+        except ValueError:
+            token.diagnoster.error_panic(
+                ErrorKind.Invalid, f"number '{literal.decode()}'"
+            )
+
+        return token
+
+    def invalid_token(self, offset: int) -> Never:
+        # A UTF-8 character is at most 4 bytes long, bytes that are not valid
+        # UTF-8 and characters that do not print are shown escaped
+        character = self.source[offset : offset + 4].decode(errors="backslashreplace")
+
+        if character.startswith("\\x") and self.source[offset] != ord("\\"):
+            character = character[:4]
+        elif not character[0].isprintable():
+            character = repr(character[0])[1:-1]
+        else:
+            character = character[0]
 
-        return Token(deepcopy(self.diagnoster), TokenKind.Identifier, literal)
+        Diagnoster(self.diagnoster.files, self.diagnoster.file_id, offset).error_panic(
+            ErrorKind.Invalid, f"token '{character}'"
+        )
@@ -1,5 +1,6 @@
 import enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator
 from .ast import *
 from .lexer import Token, TokenKind
 from .errors import ErrorKind
@@ -17,49 +18,85 @@ class Precedence(enum.Enum):
 
     @classmethod
     def from_token(cls, tok: Token):
-        match tok.kind:
-            case TokenKind.Plus | TokenKind.Minus:
-                return cls.Sum
-            case TokenKind.Star | TokenKind.ForwardSlash:
-                return cls.Product
-            case TokenKind.OpenParen:
-                return cls.Call
-            case _:
-                return cls.Lowest
+        return PRECEDENCES.get(tok.kind, cls.Lowest)
 
 
-@dataclass()
+PRECEDENCES = {
+    TokenKind.Plus: Precedence.Sum,
+    TokenKind.Minus: Precedence.Sum,
+    TokenKind.Star: Precedence.Product,
+    TokenKind.ForwardSlash: Precedence.Product,
+    TokenKind.OpenParen: Precedence.Call,
+}
+
+BINDING_POWERS = {kind: precedence.value for kind, precedence in PRECEDENCES.items()}
+
+PREFIX_PARSERS: dict[TokenKind, Callable[[Any, Diagnoster], Expression]] = {
+    TokenKind.Identifier: Identifier,
+    TokenKind.String: String,
+    TokenKind.Integer: Integer,
+    TokenKind.Float: Float,
+}
+
+TYPES = {
+    "void": Type.Void,
+    "int": Type.Integer,
+    "float": Type.Float,
+    "string": Type.String,
+}
+
+
+@dataclass
 class Parser:
-    tokens: list[Token]
+    tokens: Iterator[Token]
+    current: Token
+
+    def __init__(self, tokens: Iterable[Token]) -> None:
+        self.tokens = iter(tokens)
+        self.current = next(self.tokens)
+
+    def peek(self) -> Token:
+        return self.current
+
+    def advance(self) -> Token:
+        tok = self.current
+        self.current = next(self.tokens, tok)
+        return tok
+
+    def at_end(self) -> bool:
+        return self.current.kind == TokenKind.EOF
 
     def parse(self) -> Program:
-        program = Program([], self.tokens[-1].diagnoster)
+        body = list(self.parse_stmts())
 
-        while len(self.tokens) > 1 and self.tokens[0] != TokenKind.EOF:
-            program.body.append(self.parse_stmt())
+        return Program(body, self.current.diagnoster)
 
-        return program
+    def parse_stmts(self) -> Iterator[Statement]:
+        while not self.at_end():
+            yield self.parse_stmt()
 
     def parse_stmt(self) -> Statement:
-        match self.tokens[0]:
-            case tok if tok.kind == TokenKind.Identifier and tok.value == "fn":
-                return self.parse_function_definition()
-            case tok if tok.kind == TokenKind.Identifier and tok.value == "return":
-                return self.parse_return_statement()
-            case _:
-                return self.parse_expr()
+        tok = self.peek()
+
+        if tok.kind == TokenKind.Identifier:
+            statement_parser = STATEMENT_PARSERS.get(tok.value)
+
+            if statement_parser != None:
+                return statement_parser(self)
+
+        return self.parse_expr()
 
     def parse_function_definition(self) -> FunctionDefinition:
-        self.tokens.pop(0)
+        self.advance()
 
-        if self.tokens[0].kind != TokenKind.Identifier:
-            self.tokens[0].diagnoster.error_panic(
+        if self.peek().kind != TokenKind.Identifier:
+            self.peek().diagnoster.error_panic(
                 ErrorKind.Invalid,
                 "syntax: expected the function name to be an identifier",
             )
 
-        name = Identifier(self.tokens[0].value, self.tokens[0].diagnoster)
-        self.tokens.pop(0)
+        tok = self.advance()
+        name = Identifier(tok.value, tok.diagnoster)
 
         parameters = self.parse_function_parameters()
 
@@ -72,155 +109,157 @@ class Parser:
     def parse_function_parameters(self) -> list[FunctionParameter]:
         parameters = []
 
-        if self.tokens[0].kind != TokenKind.OpenParen:
-            self.tokens[0].diagnoster.error_panic(
+        if self.peek().kind != TokenKind.OpenParen:
+            self.peek().diagnoster.error_panic(
                 ErrorKind.Invalid,
                 "syntax: expected the function parameters to start with '('",
             )
         else:
-            self.tokens.pop(0)
+            self.advance()
 
-        while self.tokens[0].kind != TokenKind.CloseParen:
+        while self.peek().kind != TokenKind.CloseParen:
             parameters.append(self.parse_function_parameter())
 
-            if self.tokens[0].kind == TokenKind.Comma:
-                self.tokens.pop(0)
+            if self.peek().kind == TokenKind.Comma:
+                self.advance()
 
-                if self.tokens[0].kind != TokenKind.CloseParen:
+                if self.peek().kind != TokenKind.CloseParen:
                     parameters.append(self.parse_function_parameter())
 
-        if self.tokens[0].kind != TokenKind.CloseParen:
-            self.tokens[0].diagnoster.error_panic(
-                ErrorKind.Invalid,
-                "syntax: expected the function parameters to end with ')'",
-            )
-        else:
-            self.tokens.pop(0)
+        self.advance()
 
         return parameters
 
     def parse_function_parameter(self) -> FunctionParameter:
-        if self.tokens[0].kind != TokenKind.Identifier:
-            self.tokens[0].diagnoster.error_panic(
+        if self.peek().kind != TokenKind.Identifier:
+            self.peek().diagnoster.error_panic(
                 ErrorKind.Invalid,
                 "syntax: expected the function name to be an identifier",
             )
 
-        name = Identifier(self.tokens[0].value, self.tokens[0].diagnoster)
-        self.tokens.pop(0)
+        tok = self.advance()
+        name = Identifier(tok.value, tok.diagnoster)
 
         expected_type = self.parse_type()
 
-        return FunctionParameter(name, expected_type, self.tokens[0].diagnoster)
+        return FunctionParameter(name, expected_type, self.peek().diagnoster)
 
     def parse_function_body(self) -> list[Statement]:
         body = []
 
-        if self.tokens[0].kind != TokenKind.OpenBrace:
-            self.tokens[0].diagnoster.error_panic(
+        if self.peek().kind != TokenKind.OpenBrace:
+            self.peek().diagnoster.error_panic(
                 ErrorKind.Invalid,
                 "syntax: expected the function body to start with '{'",
             )
         else:
-            self.tokens.pop(0)
+            self.advance()
 
-        while self.tokens[0].kind != TokenKind.CloseBrace:
+        while self.peek().kind != TokenKind.CloseBrace:
             body.append(self.parse_stmt())
-        self.tokens.pop(0)
+        self.advance()
 
         return body
 
     def parse_return_statement(self) -> ReturnStatement:
-        self.tokens.pop(0)
+        self.advance()
 
         value = self.parse_expr()
 
         return ReturnStatement(value)
 
     def parse_type(self) -> Type:
-        tok = self.tokens.pop(0)
-
-        match tok.kind:
-            case TokenKind.Identifier:
-                match tok.value:
-                    case "void":
-                        return Type.Void
-                    case "int":
-                        return Type.Integer
-                    case "float":
-                        return Type.Float
-                    case "string":
-                        return Type.String
-                    case _:
-                        tok.diagnoster.error_panic(ErrorKind.Unspported, "type")
-            case _:
-                tok.diagnoster.error_panic(ErrorKind.Unspported, "type")
+        tok = self.advance()
+
+        if tok.kind != TokenKind.Identifier or tok.value not in TYPES:
+            tok.diagnoster.error_panic(ErrorKind.Unspported, "type")
+
+        return TYPES[tok.value]
 
     def parse_expr(self, precedence: Precedence = Precedence.Lowest) -> Expression:
-        lhs = self.parse_unary_expression()
+        """
+        Operator precedence parsing over explicit stacks instead of recursion,
+        so arbitrarily long operator chains and deeply nested calls only grow
+        lists. Every open call argument list gets its own frame.
+        """
+
+        frames = [ExpressionFrame(precedence.value)]
+
+        while True:
+            frame = frames[-1]
+            operand = self.parse_unary_expression()
+
+            while True:
+                if self.current.kind == TokenKind.OpenParen:
+                    self.advance()
+
+                    if self.current.kind != TokenKind.CloseParen:
+                        frames.append(ExpressionFrame(Precedence.Lowest.value, operand))
+                        break
+
+                    self.advance()
+                    operand = Call(operand, [])
+                    continue
+
+                binding_power = BINDING_POWERS.get(self.current.kind, 0)
+                operand = frame.reduce(operand, binding_power)
+
+                if binding_power > frame.binding_power:
+                    frame.operands.append(operand)
+                    frame.operators.append(self.advance())
+                    break
+
+                if frame.callee == None:
+                    return operand
+
+                frame.arguments.append(operand)
+
+                if self.current.kind == TokenKind.Comma:
+                    self.advance()
+
+                if self.current.kind != TokenKind.CloseParen:
+                    break
+
+                self.advance()
+                frames.pop()
+                operand = Call(frame.callee, frame.arguments)
+                frame = frames[-1]
+
+    def parse_unary_expression(self) -> Expression:
+        tok = self.advance()
+        prefix_parser = PREFIX_PARSERS.get(tok.kind)
+
+        if prefix_parser == None:
+            tok.diagnoster.error_panic(ErrorKind.Unknown, "expression")
+
+        return prefix_parser(tok.value, tok.diagnoster)
+
+
+@dataclass()
+class ExpressionFrame:
+    binding_power: int
+    callee: Expression | None = None
+    arguments: list[Expression] = field(default_factory=list)
+    operands: list[Expression] = field(default_factory=list)
+    operators: list[Token] = field(default_factory=list)
+
+    def reduce(self, rhs: Expression, binding_power: int) -> Expression:
+        """
+        Folds every pending operator binding at least as tightly as the next
+        one into rhs, which keeps operators of equal precedence left
+        associative.
+        """
 
         while (
-            len(self.tokens) > 1
-            and Precedence.from_token(self.tokens[0]).value > precedence.value
+            len(self.operators) != 0
+            and BINDING_POWERS[self.operators[-1].kind] >= binding_power
         ):
-            lhs = self.parse_binary_expression(lhs)
+            rhs = BinaryOperation(self.operands.pop(), self.operators.pop(), rhs)
 
-        return lhs
+        return rhs
 
-    def parse_unary_expression(self) -> Expression:
-        match self.tokens.pop(0):
-            case tok if tok.kind == TokenKind.Identifier:
-                return Identifier(tok.value, tok.diagnoster)
-            case tok if tok.kind == TokenKind.String:
-                return String(tok.value, tok.diagnoster)
-            case tok if tok.kind == TokenKind.Integer:
-                return Integer(tok.value, tok.diagnoster)
-            case tok if tok.kind == TokenKind.Float:
-                return Float(tok.value, tok.diagnoster)
-            case tok:
-                tok.diagnoster.error_panic(ErrorKind.Unknown, "expression")
-
-    def parse_binary_expression(self, lhs: Expression) -> Expression:
-        tok = self.tokens.pop(0)
-
-        match tok.kind:
-            case TokenKind.Plus | TokenKind.Minus | TokenKind.Star | TokenKind.ForwardSlash:
-                return self.parse_binary_operation(lhs, tok)
-            case TokenKind.OpenParen:
-                return self.parse_call(lhs)
-            case _:
-                return lhs
-
-    def parse_binary_operation(
-        self, lhs: Expression, operator: Token
-    ) -> BinaryOperation:
-        rhs = self.parse_expr(Precedence.from_token(operator))
-
-        return BinaryOperation(lhs, operator, rhs)
-
-    def parse_call(self, lhs: Expression) -> Call:
-        arguments = self.parse_call_arguments()
-
-        return Call(lhs, arguments)
-
-    def parse_call_arguments(self) -> list[Expression]:
-        arguments = []
-
-        while self.tokens[0].kind != TokenKind.CloseParen:
-            arguments.append(self.parse_expr())
-
-            if self.tokens[0].kind == TokenKind.Comma:
-                self.tokens.pop(0)
-
-                if self.tokens[0].kind != TokenKind.CloseParen:
-                    arguments.append(self.parse_expr())
-
-        if self.tokens[0].kind != TokenKind.CloseParen:
-            self.tokens[0].diagnoster.error_panic(
-                ErrorKind.Invalid,
-                "syntax: expected the call arguments to start with '('",
-            )
-        else:
-            self.tokens.pop(0)
 
-        return arguments
+STATEMENT_PARSERS: dict[str, Callable[[Parser], Statement]] = {
+    "fn": Parser.parse_function_definition,
+    "return": Parser.parse_return_statement,
+}
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 
 
-@dataclass()
+@dataclass(slots=True)
 class Position:
     line: int = 1
     column: int = 1
@@ -1,77 +1,77 @@
-import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterable, Iterator
 from .lexer import *
+from .cache import TokenSource
+from .resolver import IncludeResolver
+from .source import read_source
 from .errors import Diagnoster, ErrorKind
 
 
 @dataclass()
 class Preprocessor:
-    tokens: list[Token]
+    tokens: Iterable[Token]
     included_files: list[Path]
+    cache: TokenSource | None = None
+    resolver: IncludeResolver = field(default_factory=IncludeResolver)
+    included_identities: set[tuple[int, int] | Path] = field(
+        default_factory=set, init=False
+    )
 
-    def preprocess_tokens(self) -> list[Token]:
-        processed_tokens = []
-
-        while len(self.tokens) > 0:
-            match self.tokens.pop(0):
-                case tok if tok.kind == TokenKind.Identifier and tok.value == "include":
-                    processed_tokens.extend(self.include_file())
-                case tok:
-                    processed_tokens.append(tok)
-                    continue
-
-        return processed_tokens
+    def __post_init__(self):
+        for file_path in self.included_files:
+            self.included_identities.add(self.resolver.identity(file_path))
 
-    def find_include_file(self, file_path: Path) -> Path | None:
-        if file_path.is_file():
-            return file_path
+    def preprocess_tokens(self) -> list[Token]:
+        return list(self.stream())
 
-        pasmlib_paths = [
-            Path(os.environ.get("PREFIX", "") + "/lib/pasm"),
-            Path(os.environ.get("PATH", "") + "/pasm/lib"),
-            Path("~/pasm/lib").expanduser(),
-            Path("./lib"),
-            Path("../lib"),
-        ]
+    def stream(self) -> Iterator[Token]:
+        # One token cursor per file being expanded, the innermost include on
+        # top, so nested includes neither copy the remaining stream nor recurse
+        cursors = [iter(self.tokens)]
 
-        for pasmlib_path in pasmlib_paths:
-            combined_path = pasmlib_path.joinpath(file_path)
+        while len(cursors) != 0:
+            tokens = cursors[-1]
 
-            if combined_path.is_file():
-                return combined_path
+            for tok in tokens:
+                if tok.kind == TokenKind.Identifier and tok.value == "include":
+                    cursors.append(self.include_file(next(tokens, tok)))
+                    break
+                elif tok.kind == TokenKind.EOF and len(cursors) > 1:
+                    continue
 
-        return None
+                yield tok
+            else:
+                cursors.pop()
 
-    def include_file(self) -> list[Token]:
-        if self.tokens[0].kind != TokenKind.String or len(self.tokens[0].value) == 0:
-            self.tokens[0].diagnoster.error_panic(
+    def include_file(self, path: Token) -> Iterator[Token]:
+        if path.kind != TokenKind.String or len(path.value) == 0:
+            path.diagnoster.error_panic(
                 ErrorKind.Invalid,
                 "syntax: expected the file path to be a non-empty string",
             )
 
-        file_path = self.find_include_file(
-            self.included_files[-1].parent.joinpath(self.tokens[0].value)
+        file_path = self.resolver.resolve(
+            path.files.get_path(path.file_id).parent, path.value
         )
 
         if file_path == None:
-            self.tokens[0].diagnoster.error_panic(
-                ErrorKind.Invalid, f"include: {self.tokens[0].value} is not a file"
+            path.diagnoster.error_panic(
+                ErrorKind.Invalid, f"include: {path.value} is not a file"
             )
 
-        self.tokens.pop(0)
+        identity = self.resolver.identity(file_path)
 
-        if file_path in self.included_files:
-            return []
+        if identity in self.included_identities:
+            return iter(())
         else:
+            self.included_identities.add(identity)
             self.included_files.append(file_path)
 
-        with open(file_path, "r") as f:
-            lexer = Lexer(list(f.read()), Diagnoster(file_path))
-            file_tokens = lexer.tokenize()
-            file_tokens.pop()  # Pop the EOF Token
+        if self.cache != None:
+            return iter(self.cache.load(file_path, path.files))
 
-        file_tokens.extend(self.tokens)
-        self.tokens = file_tokens
+        source = read_source(file_path)
+        lexer = Lexer(source, Diagnoster(path.files, path.files.add(file_path, source)))
 
-        return self.preprocess_tokens()
+        return lexer.stream()
@@ -0,0 +1,73 @@
+import os
+import stat
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+def default_include_paths() -> list[Path]:
+    return [
+        Path(os.environ.get("PREFIX", "") + "/lib/pasm"),
+        Path(os.environ.get("PATH", "") + "/pasm/lib"),
+        Path("~/pasm/lib").expanduser(),
+        Path("./lib"),
+        Path("../lib"),
+    ]
+
+
+@dataclass()
+class IncludeResolver:
+    include_paths: list[Path] = field(default_factory=list)
+    search_paths: list[Path] = field(init=False)
+    lookups: dict[tuple[Path, str], Path | None] = field(default_factory=dict)
+    stats: dict[Path, os.stat_result | None] = field(default_factory=dict)
+    stat_count: int = 0
+
+    def __post_init__(self):
+        self.search_paths = self.include_paths + default_include_paths()
+
+    def resolve(self, directory: Path, name: str) -> Path | None:
+        key = (directory, name)
+
+        if key in self.lookups:
+            return self.lookups[key]
+
+        file_path = None
+
+        for candidate in [directory.joinpath(name)] + [
+            search_path.joinpath(name) for search_path in self.search_paths
+        ]:
+            if self.is_file(candidate):
+                file_path = candidate
+                break
+
+        self.lookups[key] = file_path
+
+        return file_path
+
+    def is_file(self, file_path: Path) -> bool:
+        file_stat = self.stat(file_path)
+
+        return file_stat != None and stat.S_ISREG(file_stat.st_mode)
+
+    def identity(self, file_path: Path) -> tuple[int, int] | Path:
+        file_stat = self.stat(file_path)
+
+        if file_stat == None:
+            return file_path.absolute()
+
+        return (file_stat.st_dev, file_stat.st_ino)
+
+    def stat(self, file_path: Path) -> os.stat_result | None:
+        if file_path in self.stats:
+            return self.stats[file_path]
+
+        self.stat_count += 1
+
+        try:
+            file_stat = file_path.stat()
+        except (OSError, ValueError):
+            file_stat = None
+
+        self.stats[file_path] = file_stat
+
+        return file_stat
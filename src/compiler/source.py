@@ -0,0 +1,84 @@
+import mmap
+import os
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from .position import Position
+
+
+def read_source(path: Path) -> bytes | mmap.mmap:
+    """
+    Maps a source file read only, the lexer matches over its bytes directly so
+    the file is never copied into a string.
+    """
+
+    with open(path, "rb") as f:
+        # Empty files cannot be mapped
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@dataclass(slots=True)
+class SourceFile:
+    path: Path
+    # Files loaded from the token cache are only read again if an error has to
+    # be reported in them
+    source: bytes | mmap.mmap | None = None
+    line_starts: list[int] | None = None
+
+    def __reduce__(self):
+        # Maps cannot be pickled, a copy sent to another process reads the
+        # file again if it ever needs it
+        return (SourceFile, (self.path,))
+
+    def get_source(self) -> bytes | mmap.mmap:
+        if self.source == None:
+            self.source = read_source(self.path)
+
+        return self.source
+
+    def get_line_starts(self) -> list[int]:
+        if self.line_starts == None:
+            source = self.get_source()
+            line_starts = [0]
+            offset = source.find(b"\n")
+
+            while offset != -1:
+                line_starts.append(offset + 1)
+                offset = source.find(b"\n", offset + 1)
+
+            self.line_starts = line_starts
+
+        return self.line_starts
+
+
+@dataclass()
+class FileTable:
+    """
+    Every file read during a compilation, locations elsewhere are only a file
+    id and a byte offset into that file. Lines and columns are worked out when
+    an error is reported.
+    """
+
+    files: list[SourceFile] = field(default_factory=list)
+
+    def add(self, path: Path, source: bytes | mmap.mmap | None = None) -> int:
+        self.files.append(SourceFile(path, source))
+
+        return len(self.files) - 1
+
+    def get_path(self, file_id: int) -> Path:
+        return self.files[file_id].path
+
+    def get_position(self, file_id: int, offset: int) -> Position:
+        file = self.files[file_id]
+        line_starts = file.get_line_starts()
+        line = bisect_right(line_starts, offset)
+
+        # Columns count characters, not bytes
+        line_start = line_starts[line - 1]
+        column = len(file.get_source()[line_start:offset].decode(errors="replace"))
+
+        return Position(line, column + 1)
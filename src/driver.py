@@ -0,0 +1,259 @@
+import platform
+import sys
+import time
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, TextIO
+from compiler.errors import Diagnoster
+import compiler.ast
+import compiler.cache
+import compiler.preprocessor
+import compiler.resolver
+import compiler.lexer
+import compiler.source
+import compiler.parser
+import compiler.ir.gen
+import compiler.ir.linear
+import compiler.ir.optimize
+import compiler.ir.verify
+import compiler.asm.code
+import compiler.asm.gen
+import compiler.asm.backends.aarch64
+
+from pprint import PrettyPrinter
+
+pprinter = PrettyPrinter()
+
+# State of a batch worker process, set once by initialize_worker so every file
+# a worker compiles shares one token cache and include resolver
+worker_args: Namespace | None = None
+worker_token_cache: compiler.cache.TokenCache | None = None
+worker_include_resolver: compiler.resolver.IncludeResolver | None = None
+
+
+@dataclass()
+class TeeOutput:
+    """
+    Writes the assembly to its output file and echoes it to stdout for
+    --emit-outputs as it is generated
+    """
+
+    outputs: list[TextIO]
+
+    def write(self, text: str):
+        for output in self.outputs:
+            output.write(text)
+
+
+def create_token_cache(args: Namespace) -> compiler.cache.TokenCache | None:
+    return None if args.no_cache else compiler.cache.TokenCache(args.cache_dir)
+
+
+def compile_file(
+    args: Namespace,
+    file_path: Path,
+    output_path: str,
+    token_cache: compiler.cache.TokenCache | None,
+    include_resolver: compiler.resolver.IncludeResolver,
+    jobs: int = 1,
+):
+    """
+    Compiles one source file to assembly at output_path. The token cache and
+    the include resolver can be shared by every file compiled in a process.
+    """
+
+    source = compiler.source.read_source(file_path)
+    files = compiler.source.FileTable()
+    lexer = compiler.lexer.Lexer(
+        source, Diagnoster(files, files.add(file_path, source))
+    )
+
+    tokens = compiler.preprocessor.Preprocessor(
+        lexer.stream(), [file_path], token_cache, include_resolver
+    ).stream()
+
+    if args.emit_outputs:
+        tokens = list(tokens)
+
+        print("Tokens :")
+        pprinter.pprint(tokens)
+        print()
+
+    parser = compiler.parser.Parser(tokens)
+
+    if args.emit_outputs:
+        program = parser.parse()
+
+        print("AST :")
+        pprinter.pprint(program)
+        print()
+
+        ir_gen = compiler.ir.gen.IRGen(program)
+        ir_gen.generate()
+    else:
+        # Lower every top-level statement as soon as it is parsed, so only the
+        # tokens and AST of the function being compiled are alive at a time
+        ir_gen = compiler.ir.gen.IRGen(compiler.ast.Program([], lexer.diagnoster))
+
+        for stmt in parser.parse_stmts():
+            ir_gen.generate_stmt(stmt)
+
+        ir_gen.code.diagnoster = parser.peek().diagnoster
+
+    # Interning is counted as the literals are generated, dead function
+    # elimination later drops literals of its own and reports them apart
+    string_literals = len(ir_gen.code.string_literals)
+    string_bytes_saved = ir_gen.code.string_bytes_saved
+
+    optimizer = compiler.ir.optimize.Optimizer(
+        ir_gen.code, args.optimization_level, args.exported
+    )
+    optimizer.run()
+
+    compiler.ir.verify.IRVerifier(ir_gen.code).run()
+
+    if args.emit_outputs:
+        print("IR :")
+        pprinter.pprint(ir_gen.code)
+        print()
+
+    if args.verbose:
+        print(
+            f"include resolver: {len(include_resolver.lookups)} lookups, {include_resolver.stat_count} stats",
+            file=sys.stderr,
+        )
+
+        print(
+            f"string literals: {string_literals} unique, {string_bytes_saved} bytes saved by interning",
+            file=sys.stderr,
+        )
+
+        print(
+            f"inlining: {optimizer.inliner.inlined} calls inlined",
+            file=sys.stderr,
+        )
+
+        print(
+            f"constant folding: {optimizer.constant_folder.folded} operations folded",
+            file=sys.stderr,
+        )
+
+        print(
+            f"compile time evaluation: {optimizer.compile_time_evaluator.evaluated} calls evaluated",
+            file=sys.stderr,
+        )
+
+        print(
+            f"dead functions: {optimizer.dead_function_eliminator.removed} functions, {optimizer.dead_function_eliminator.removed_string_literals} string literals removed",
+            file=sys.stderr,
+        )
+
+        if token_cache != None:
+            print(
+                f"token cache: {token_cache.hits} hits, {token_cache.misses} misses, {token_cache.evictions} evictions",
+                file=sys.stderr,
+            )
+
+    match platform.machine():
+        case "aarch64":
+            if output_path == "-":
+                asm_output = sys.stdout
+            else:
+                asm_output = open(output_path, "w", buffering=1 << 16)
+
+            # Assembly written to stdout already shows up in the dump
+            if args.emit_outputs and asm_output != sys.stdout:
+                code_output = TeeOutput([asm_output, sys.stdout])
+            else:
+                code_output = asm_output
+
+            asm_backend = compiler.asm.backends.aarch64.Aarch64Backend(
+                compiler.asm.code.ASMCode(code_output)
+            )
+
+            if args.optimization_level >= 1:
+                asm_backend.enable_peephole()
+
+            linear_code = compiler.ir.linear.LinearLowering(
+                ir_gen.code, asm_backend.fits_immediate_operand
+            ).run()
+
+            if args.emit_outputs:
+                print("Linear IR :")
+                pprinter.pprint(linear_code)
+                print()
+                print("Assembly :")
+
+            asm_gen = compiler.asm.gen.ASMGen(asm_backend, linear_code, jobs)
+            asm_gen.generate()
+
+            if args.verbose and asm_backend.peephole != None:
+                print(
+                    "peephole: "
+                    + ", ".join(
+                        f"{hits} {rule}"
+                        for rule, hits in asm_backend.peephole.hits.items()
+                    ),
+                    file=sys.stderr,
+                )
+
+            asm_output.flush()
+
+            if asm_output != sys.stdout:
+                asm_output.close()
+        case m:
+            print(m, "is not a supported machine yet")
+            exit(1)
+
+
+def compile_files(
+    args: Namespace, inputs: list[tuple[Path, str]]
+) -> Iterator[tuple[Path, float]]:
+    """
+    Compiles a batch of (source, output) pairs in this process, or across
+    args.jobs worker processes, yielding the compile time of every file in
+    input order.
+    """
+
+    if args.jobs > 1 and len(inputs) > 1:
+        with ProcessPoolExecutor(
+            min(args.jobs, len(inputs)),
+            initializer=initialize_worker,
+            initargs=(args,),
+        ) as pool:
+            yield from zip(
+                (file_path for file_path, _ in inputs),
+                pool.map(compile_worker, *zip(*inputs)),
+            )
+    else:
+        token_cache = create_token_cache(args)
+        include_resolver = compiler.resolver.IncludeResolver(args.include_paths)
+
+        for file_path, output_path in inputs:
+            start = time.perf_counter()
+            compile_file(args, file_path, output_path, token_cache, include_resolver)
+
+            yield file_path, time.perf_counter() - start
+
+
+def initialize_worker(args: Namespace):
+    global worker_args, worker_token_cache, worker_include_resolver
+
+    worker_args = args
+    worker_token_cache = create_token_cache(args)
+    worker_include_resolver = compiler.resolver.IncludeResolver(args.include_paths)
+
+
+def compile_worker(file_path: Path, output_path: str) -> float:
+    start = time.perf_counter()
+    compile_file(
+        worker_args,
+        file_path,
+        output_path,
+        worker_token_cache,
+        worker_include_resolver,
+    )
+
+    return time.perf_counter() - start
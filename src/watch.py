@@ -0,0 +1,320 @@
+import bisect
+import platform
+import sys
+import time
+from argparse import Namespace
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+from compiler.errors import Diagnoster
+import compiler.ast
+import compiler.preprocessor
+import compiler.resolver
+import compiler.lexer
+import compiler.source
+import compiler.parser
+import compiler.ir.gen
+import compiler.ir.linear
+import compiler.ir.optimize
+import compiler.ir.verify
+import compiler.asm.code
+import compiler.asm.gen
+import compiler.asm.backends.aarch64
+
+# Seconds between two scans of the mtimes of every watched file
+POLL_INTERVAL = 0.5
+
+
+@dataclass()
+class WatchedFile:
+    path: Path
+    # mtime and size of the file when it was last lexed, None if it could not
+    # be read
+    stat: tuple[int, int] | None = None
+    tokens: list[compiler.lexer.Token] | None = None
+    offsets: list[int] = field(default_factory=list)
+    # Top-level statements parsed from this file, by the offset of their first
+    # token, along with the number of tokens they were parsed from
+    statements: dict[int, tuple[compiler.ast.Statement, int]] = field(
+        default_factory=dict
+    )
+
+
+@dataclass()
+class WatchedUnit:
+    file_path: Path
+    output_path: str
+    # Ids of every file the last build read, from the included files of its
+    # preprocessor
+    dependencies: set[int] = field(default_factory=set)
+    functions: compiler.asm.gen.FunctionCache = field(
+        default_factory=compiler.asm.gen.FunctionCache
+    )
+
+
+@dataclass()
+class StatementTokens:
+    """
+    Counts the tokens a parser takes from a stream and checks whether the
+    tokens of the statement being parsed all came from one file.
+    """
+
+    tokens: Iterator[compiler.lexer.Token]
+    count: int = 0
+    file_id: int = -1
+    mixed: bool = False
+    previous: compiler.lexer.Token | None = None
+    last: compiler.lexer.Token | None = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> compiler.lexer.Token:
+        # The parser holds one token of lookahead, a token is only part of the
+        # statement once the parser has moved past it
+        if self.last != None:
+            self.count += 1
+            self.previous = self.last
+            self.mixed = self.mixed or self.last.file_id != self.file_id
+
+        self.last = next(self.tokens)
+
+        return self.last
+
+    def start(self):
+        self.count = 0
+        self.file_id = self.last.file_id
+        self.mixed = False
+
+
+@dataclass()
+class Watcher:
+    """
+    Keeps the tokens and top-level statements of every file and the assembly
+    of every function between builds. A change to a file only lexes and
+    parses that file again, then rebuilds the units that read it. IR
+    generation, optimization and lowering still run over the whole unit,
+    since inlining and dead function elimination look across functions, but
+    only functions whose linear code changed are generated again.
+    """
+
+    args: Namespace
+    units: list[WatchedUnit]
+    files: compiler.source.FileTable = field(default_factory=compiler.source.FileTable)
+    watched: list[WatchedFile] = field(default_factory=list)
+    file_ids: dict[Path, int] = field(default_factory=dict)
+    lexed: int = 0
+    parsed: int = 0
+    reused: int = 0
+
+    def run(self):
+        for unit in self.units:
+            self.build(unit)
+
+        while True:
+            time.sleep(POLL_INTERVAL)
+            changed = self.poll()
+
+            if len(changed) == 0:
+                continue
+
+            for unit in self.units:
+                if not unit.dependencies.isdisjoint(changed):
+                    self.build(unit)
+
+    def poll(self) -> set[int]:
+        changed = set()
+
+        for file_id, watched in enumerate(self.watched):
+            stat = self.stat(watched.path)
+
+            if stat != watched.stat:
+                watched.stat = stat
+                watched.tokens = None
+                watched.offsets = []
+                watched.statements = {}
+                changed.add(file_id)
+
+        return changed
+
+    def stat(self, file_path: Path) -> tuple[int, int] | None:
+        try:
+            file_stat = file_path.stat()
+        except OSError:
+            return None
+
+        return (file_stat.st_mtime_ns, file_stat.st_size)
+
+    def get_file_id(self, file_path: Path) -> int:
+        resolved_path = file_path.resolve()
+        file_id = self.file_ids.get(resolved_path)
+
+        if file_id == None:
+            file_id = self.files.add(file_path)
+            self.file_ids[resolved_path] = file_id
+            self.watched.append(WatchedFile(file_path))
+
+        return file_id
+
+    def load(
+        self, file_path: Path, files: compiler.source.FileTable
+    ) -> list[compiler.lexer.Token]:
+        """
+        The token source of the preprocessor, every file keeps its id in the
+        file table of the watcher and is only lexed again once it changed.
+        """
+
+        file_id = self.get_file_id(file_path)
+        watched = self.watched[file_id]
+
+        if watched.tokens == None:
+            watched.stat = self.stat(file_path)
+
+            # Files are read instead of mapped, an editor truncating a mapped
+            # file would fault a later read of the map
+            source = file_path.read_bytes()
+            self.files.files[file_id] = compiler.source.SourceFile(file_path, source)
+
+            watched.tokens = compiler.lexer.Lexer(
+                source, Diagnoster(self.files, file_id)
+            ).tokenize()
+            watched.offsets = [tok.offset for tok in watched.tokens]
+            self.lexed += 1
+
+        return watched.tokens
+
+    def build(self, unit: WatchedUnit):
+        self.lexed = 0
+        self.parsed = 0
+        self.reused = 0
+        unit.functions.hits = 0
+        unit.functions.misses = 0
+
+        start = time.perf_counter()
+        dependencies = set()
+        preprocessor = compiler.preprocessor.Preprocessor(
+            [],
+            [unit.file_path],
+            self,
+            compiler.resolver.IncludeResolver(self.args.include_paths),
+        )
+
+        try:
+            preprocessor.tokens = self.load(unit.file_path, self.files)
+            self.generate(unit, preprocessor)
+        except (OSError, SystemExit) as e:
+            if isinstance(e, OSError):
+                print(f"{e.filename}: {e.strerror}", file=sys.stderr)
+
+            # A failed build stops at the first error, it may not have reached
+            # files the last build read, such as an include that went missing
+            dependencies = unit.dependencies
+        else:
+            print(
+                f"{unit.file_path}: built in {time.perf_counter() - start:.3f}s, {self.lexed} files lexed, {self.parsed} statements parsed, {self.reused} reused, {unit.functions.misses} functions generated, {unit.functions.hits} reused",
+                file=sys.stderr,
+            )
+
+        unit.dependencies = dependencies | {
+            self.get_file_id(file_path) for file_path in preprocessor.included_files
+        }
+
+    def generate(
+        self, unit: WatchedUnit, preprocessor: compiler.preprocessor.Preprocessor
+    ):
+        tokens = StatementTokens(preprocessor.stream())
+        parser = compiler.parser.Parser(tokens)
+        ir_gen = compiler.ir.gen.IRGen(
+            compiler.ast.Program([], parser.peek().diagnoster)
+        )
+
+        for stmt in self.parse_stmts(parser, tokens):
+            ir_gen.generate_stmt(stmt)
+
+        ir_gen.code.diagnoster = parser.peek().diagnoster
+
+        compiler.ir.optimize.Optimizer(
+            ir_gen.code, self.args.optimization_level, self.args.exported
+        ).run()
+
+        compiler.ir.verify.IRVerifier(ir_gen.code).run()
+
+        if unit.output_path == "-":
+            asm_output = sys.stdout
+        else:
+            asm_output = open(unit.output_path, "w", buffering=1 << 16)
+
+        asm_backend = compiler.asm.backends.aarch64.Aarch64Backend(
+            compiler.asm.code.ASMCode(asm_output)
+        )
+
+        if self.args.optimization_level >= 1:
+            asm_backend.enable_peephole()
+
+        linear_code = compiler.ir.linear.LinearLowering(
+            ir_gen.code, asm_backend.fits_immediate_operand
+        ).run()
+
+        try:
+            compiler.asm.gen.ASMGen(
+                asm_backend, linear_code, cache=unit.functions
+            ).generate()
+        finally:
+            asm_output.flush()
+
+            if asm_output != sys.stdout:
+                asm_output.close()
+
+    def parse_stmts(
+        self, parser: compiler.parser.Parser, tokens: StatementTokens
+    ) -> Iterator[compiler.ast.Statement]:
+        """
+        Parses the top-level statements of a unit, a statement parsed from the
+        same tokens of an unchanged file in an earlier build is skipped over
+        and reused instead.
+        """
+
+        while not parser.at_end():
+            tok = parser.peek()
+            watched = self.watched[tok.file_id]
+            reused = watched.statements.get(tok.offset)
+
+            if reused != None:
+                stmt, count = reused
+
+                for _ in range(count):
+                    parser.advance()
+
+                self.reused += 1
+                yield stmt
+                continue
+
+            tokens.start()
+            stmt = parser.parse_stmt()
+            self.parsed += 1
+
+            # Only statements made of consecutive tokens of a single file are
+            # kept, an include expanded or skipped inside one would make its
+            # tokens depend on more than that file
+            if not tokens.mixed and tokens.count == (
+                bisect.bisect_left(watched.offsets, tokens.previous.offset)
+                - bisect.bisect_left(watched.offsets, tok.offset)
+                + 1
+            ):
+                watched.statements[tok.offset] = (stmt, tokens.count)
+
+            yield stmt
+
+
+def watch(args: Namespace, inputs: list[tuple[Path, str]]):
+    if platform.machine() != "aarch64":
+        print(platform.machine(), "is not a supported machine yet")
+        exit(1)
+
+    try:
+        Watcher(
+            args,
+            [WatchedUnit(file_path, output_path) for file_path, output_path in inputs],
+        ).run()
+    except KeyboardInterrupt:
+        pass